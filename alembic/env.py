@@ -7,7 +7,7 @@ import os
 from app.core.database import Base
 from app.models.user import User, RefreshToken
 from app.models.crm import Client, Projet
-from app.models.devis import Devis, LotDevis, LignePoste, Facture
+from app.models.devis import Devis, LotDevis, LignePoste, Facture, CompteurNumerotation
 from app.models.chantier import JalonChantier, JournalEntry, PointageHeures
 
 # Alembic Config object
@@ -0,0 +1,161 @@
+"""Baseline schema: tables historically created by create_all at startup
+
+Revision ID: 000_baseline_schema
+Revises:
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '000_baseline_schema'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _create_table(inspector, name, *columns, indexes=(), unique=()):
+    # Bases déjà créées par create_all : la table existe, on la laisse telle quelle
+    if inspector.has_table(name):
+        return
+    op.create_table(name, *columns, sa.PrimaryKeyConstraint('id'))
+    op.create_index(op.f(f'ix_{name}_id'), name, ['id'], unique=False)
+    for column in indexes:
+        op.create_index(op.f(f'ix_{name}_{column}'), name, [column], unique=column in unique)
+
+
+def upgrade() -> None:
+    # Schéma d'origine (avant 001) ; les révisions suivantes y ajoutent leurs colonnes.
+    inspector = sa.inspect(op.get_bind())
+
+    _create_table(
+        inspector, 'users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('email', sa.String(), nullable=True),
+        sa.Column('hashed_password', sa.String(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('full_name', sa.String(), nullable=True),
+        sa.Column('role', sa.String(), nullable=True),
+        sa.Column('date_creation', sa.DateTime(), nullable=True),
+        indexes=('email',), unique=('email',),
+    )
+    _create_table(
+        inspector, 'clients',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('nom_societe', sa.String(), nullable=True),
+        sa.Column('nom_contact', sa.String(), nullable=True),
+        sa.Column('prenom_contact', sa.String(), nullable=True),
+        sa.Column('telephone', sa.String(), nullable=True),
+        sa.Column('email', sa.String(), nullable=True),
+        sa.Column('adresse', sa.String(), nullable=True),
+        sa.Column('date_creation', sa.DateTime(), nullable=True),
+        indexes=('nom_societe', 'email'), unique=('email',),
+    )
+    _create_table(
+        inspector, 'projets',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('nom', sa.String(), nullable=True),
+        sa.Column('description', sa.String(), nullable=True),
+        sa.Column('statut', sa.String(), nullable=True),
+        sa.Column('date_creation', sa.DateTime(), nullable=True),
+        sa.Column('client_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['client_id'], ['clients.id']),
+        indexes=('nom',),
+    )
+    _create_table(
+        inspector, 'devis',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('projet_id', sa.Integer(), nullable=True),
+        sa.Column('client_id', sa.Integer(), nullable=True),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('nom', sa.String(), nullable=True),
+        sa.Column('statut', sa.String(), nullable=False),
+        sa.Column('date_emission', sa.DateTime(), nullable=True),
+        sa.Column('taux_tva', sa.Float(), nullable=True),
+        sa.Column('total_ht', sa.Float(), nullable=True),
+        sa.Column('total_ttc', sa.Float(), nullable=True),
+        sa.Column('validite_jours', sa.Integer(), nullable=True),
+        sa.Column('signature_path', sa.String(), nullable=True),
+        sa.ForeignKeyConstraint(['projet_id'], ['projets.id']),
+        sa.ForeignKeyConstraint(['client_id'], ['clients.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        indexes=('nom',),
+    )
+    _create_table(
+        inspector, 'lots_devis',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('devis_id', sa.Integer(), nullable=True),
+        sa.Column('nom', sa.String(), nullable=True),
+        sa.Column('ordre', sa.Integer(), nullable=True),
+        sa.Column('total_lot_ht', sa.Float(), nullable=True),
+        sa.ForeignKeyConstraint(['devis_id'], ['devis.id']),
+    )
+    _create_table(
+        inspector, 'lignes_poste',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('lot_id', sa.Integer(), nullable=True),
+        sa.Column('designation', sa.String(), nullable=True),
+        sa.Column('unite', sa.String(), nullable=True),
+        sa.Column('quantite', sa.Float(), nullable=True),
+        sa.Column('prix_unitaire_ht', sa.Float(), nullable=True),
+        sa.Column('total_ligne_ht', sa.Float(), nullable=True),
+        sa.ForeignKeyConstraint(['lot_id'], ['lots_devis.id']),
+    )
+    _create_table(
+        inspector, 'factures',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('devis_id', sa.Integer(), nullable=True),
+        sa.Column('numero_facture', sa.String(), nullable=False),
+        sa.Column('total_ht', sa.Float(), nullable=True),
+        sa.Column('total_ttc', sa.Float(), nullable=True),
+        sa.Column('date_emission', sa.DateTime(), nullable=True),
+        sa.Column('date_prestation', sa.DateTime(), nullable=True),
+        sa.Column('mention_franchise_tva', sa.String(), nullable=True),
+        sa.ForeignKeyConstraint(['devis_id'], ['devis.id']),
+        indexes=('numero_facture',), unique=('numero_facture',),
+    )
+    _create_table(
+        inspector, 'jalons_chantier',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('projet_id', sa.Integer(), nullable=True),
+        sa.Column('nom', sa.String(), nullable=True),
+        sa.Column('date_prevue', sa.Date(), nullable=True),
+        sa.Column('date_realisation', sa.Date(), nullable=True),
+        sa.Column('termine', sa.Boolean(), nullable=True),
+        sa.ForeignKeyConstraint(['projet_id'], ['projets.id']),
+    )
+    _create_table(
+        inspector, 'journal_chantier',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('projet_id', sa.Integer(), nullable=True),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('date_entry', sa.DateTime(), nullable=True),
+        sa.Column('type_entry', sa.String(), nullable=True),
+        sa.Column('description', sa.String(), nullable=True),
+        sa.Column('file_url', sa.String(), nullable=True),
+        sa.ForeignKeyConstraint(['projet_id'], ['projets.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+    )
+    _create_table(
+        inspector, 'pointage_heures',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('projet_id', sa.Integer(), nullable=True),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('date_travail', sa.Date(), nullable=True),
+        sa.Column('heures_debut', sa.DateTime(), nullable=True),
+        sa.Column('heures_fin', sa.DateTime(), nullable=True),
+        sa.Column('duree_heures', sa.Float(), nullable=True),
+        sa.Column('lot_rattachement', sa.String(), nullable=True),
+        sa.ForeignKeyConstraint(['projet_id'], ['projets.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+    )
+
+
+def downgrade() -> None:
+    for table in (
+        'pointage_heures', 'journal_chantier', 'jalons_chantier', 'factures',
+        'lignes_poste', 'lots_devis', 'devis', 'projets', 'clients', 'users',
+    ):
+        op.drop_table(table)
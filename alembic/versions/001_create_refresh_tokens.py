@@ -1,7 +1,7 @@
 """Create refresh_tokens table
 
 Revision ID: 001_create_refresh_tokens
-Revises: 
+Revises: 000_baseline_schema
 Create Date: 2026-01-29 00:00:00.000000
 
 """
@@ -11,12 +11,15 @@ import sqlalchemy as sa
 
 # revision identifiers, used by Alembic.
 revision = '001_create_refresh_tokens'
-down_revision = None
+down_revision = '000_baseline_schema'
 branch_labels = None
 depends_on = None
 
 
 def upgrade() -> None:
+    # Bases créées par l'ancien create_all au démarrage : la table existe déjà
+    if sa.inspect(op.get_bind()).has_table('refresh_tokens'):
+        return
     # Create refresh_tokens table
     op.create_table(
         'refresh_tokens',
@@ -0,0 +1,64 @@
+"""Add factures.statut and the compteurs_numerotation table
+
+Revision ID: 002_facture_numerotation
+Revises: 001_create_refresh_tokens
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '002_facture_numerotation'
+down_revision = '001_create_refresh_tokens'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+
+    # Un compteur par série de numérotation légale
+    if not inspector.has_table('compteurs_numerotation'):
+        op.create_table(
+            'compteurs_numerotation',
+            sa.Column('serie', sa.String(), nullable=False),
+            sa.Column('dernier_numero', sa.Integer(), nullable=False, server_default='0'),
+            sa.PrimaryKeyConstraint('serie'),
+        )
+
+    # Statut de facture (Brouillon, Validée, Avoir) utilisé par le service
+    if 'statut' not in {c['name'] for c in inspector.get_columns('factures')}:
+        op.add_column(
+            'factures',
+            sa.Column('statut', sa.String(), nullable=False, server_default='Brouillon'),
+        )
+        # Les factures déjà numérotées sont émises, donc inaltérables
+        op.execute(
+            "UPDATE factures SET statut = CASE WHEN numero_facture LIKE 'AVOIR%' "
+            "THEN 'Avoir' ELSE 'Validée' END"
+        )
+
+    # Reprise : chaque série repart du plus grand numéro déjà émis (suffixe SERIE-AAAAMMJJ-NNN)
+    bind = op.get_bind()
+    numeros = bind.execute(sa.text('SELECT numero_facture FROM factures')).scalars()
+    derniers = {}
+    for numero in numeros:
+        serie, _, suffixe = (numero or '').partition('-')
+        suffixe = suffixe.rsplit('-', 1)[-1]
+        if serie and suffixe.isdigit():
+            derniers[serie] = max(derniers.get(serie, 0), int(suffixe))
+    compteurs = sa.table(
+        'compteurs_numerotation',
+        sa.column('serie', sa.String()),
+        sa.column('dernier_numero', sa.Integer()),
+    )
+    for serie, dernier in derniers.items():
+        bind.execute(sa.delete(compteurs).where(compteurs.c.serie == serie))
+        bind.execute(sa.insert(compteurs).values(serie=serie, dernier_numero=dernier))
+
+
+def downgrade() -> None:
+    op.drop_table('compteurs_numerotation')
+    op.drop_column('factures', 'statut')
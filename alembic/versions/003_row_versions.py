@@ -0,0 +1,37 @@
+"""Add a row version column to clients, projets, devis and factures (ETags)
+
+Revision ID: 003_row_versions
+Revises: 002_facture_numerotation
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '003_row_versions'
+down_revision = '002_facture_numerotation'
+branch_labels = None
+depends_on = None
+
+TABLES = ('clients', 'projets', 'devis', 'factures')
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    for table in TABLES:
+        if 'version' in {c['name'] for c in inspector.get_columns(table)}:
+            continue
+        op.add_column(
+            table,
+            sa.Column('version', sa.Integer(), nullable=False, server_default='1'),
+        )
+
+
+def downgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    for table in TABLES:
+        if inspector.has_table(table) and 'version' in {c['name'] for c in inspector.get_columns(table)}:
+            with op.batch_alter_table(table) as batch_op:
+                batch_op.drop_column('version')
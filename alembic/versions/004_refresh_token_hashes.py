@@ -0,0 +1,61 @@
+"""Store refresh tokens as SHA-256 hashes and index expires_at
+
+Revision ID: 004_refresh_token_hashes
+Revises: 003_row_versions
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+import hashlib
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '004_refresh_token_hashes'
+down_revision = '003_row_versions'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if 'token_hash' in {c['name'] for c in inspector.get_columns('refresh_tokens')}:
+        return  # table déjà créée avec le nouveau schéma
+
+    # Les jetons expirés ou révoqués n'ont pas besoin d'être migrés
+    bind.execute(
+        sa.text('DELETE FROM refresh_tokens WHERE revoked = :vrai OR expires_at < :maintenant'),
+        {'vrai': True, 'maintenant': datetime.utcnow()},
+    )
+
+    with op.batch_alter_table('refresh_tokens', reflect_kwargs={'resolve_fks': False}) as batch_op:
+        batch_op.add_column(sa.Column('token_hash', sa.String(64), nullable=True))
+
+    # Remplace chaque jeton en clair par son empreinte
+    rows = bind.execute(sa.text('SELECT id, token FROM refresh_tokens')).all()
+    for row_id, token in rows:
+        bind.execute(
+            sa.text('UPDATE refresh_tokens SET token_hash = :h WHERE id = :id'),
+            {'h': hashlib.sha256(token.encode('utf-8')).hexdigest(), 'id': row_id},
+        )
+
+    with op.batch_alter_table('refresh_tokens', reflect_kwargs={'resolve_fks': False}) as batch_op:
+        batch_op.drop_index('ix_refresh_tokens_token')
+        batch_op.drop_column('token')
+        batch_op.alter_column('token_hash', existing_type=sa.String(64), nullable=False)
+        batch_op.create_index('ix_refresh_tokens_token_hash', ['token_hash'], unique=True)
+        batch_op.create_index('ix_refresh_tokens_expires_at', ['expires_at'])
+
+
+def downgrade() -> None:
+    # Les jetons en clair ne sont pas récupérables : les sessions en cours sont perdues
+    op.execute('DELETE FROM refresh_tokens')
+    with op.batch_alter_table('refresh_tokens', reflect_kwargs={'resolve_fks': False}) as batch_op:
+        batch_op.drop_index('ix_refresh_tokens_expires_at')
+        batch_op.drop_index('ix_refresh_tokens_token_hash')
+        batch_op.drop_column('token_hash')
+        batch_op.add_column(sa.Column('token', sa.String(), nullable=False))
+        batch_op.create_index('ix_refresh_tokens_token', ['token'], unique=True)
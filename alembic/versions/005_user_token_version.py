@@ -0,0 +1,31 @@
+"""Add users.token_version (per-user token generation)
+
+Revision ID: 005_user_token_version
+Revises: 004_refresh_token_hashes
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '005_user_token_version'
+down_revision = '004_refresh_token_hashes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if 'token_version' not in {c['name'] for c in inspector.get_columns('users')}:
+        # Les jetons déjà émis (sans claim "tv") valent génération 0 : ils restent valides
+        op.add_column(
+            'users',
+            sa.Column('token_version', sa.Integer(), nullable=False, server_default='0'),
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('token_version')
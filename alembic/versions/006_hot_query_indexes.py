@@ -0,0 +1,57 @@
+"""Index the hot filters: devis statut/projet, factures, pointages, journal
+
+Revision ID: 006_hot_query_indexes
+Revises: 005_user_token_version
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '006_hot_query_indexes'
+down_revision = '005_user_token_version'
+branch_labels = None
+depends_on = None
+
+# (nom, table, colonnes) ; sa.text pour l'ordre descendant
+INDEXES = (
+    ('ix_devis_statut_date_emission', 'devis', ['statut', 'date_emission', 'id']),
+    ('ix_devis_date_emission_id', 'devis', ['date_emission', 'id']),
+    ('ix_devis_projet_id', 'devis', ['projet_id']),
+    ('ix_lots_devis_devis_id', 'lots_devis', ['devis_id']),
+    ('ix_lignes_poste_lot_id', 'lignes_poste', ['lot_id']),
+    ('ix_factures_devis_id_statut', 'factures', ['devis_id', 'statut']),
+    ('ix_pointage_heures_user_id_date_travail', 'pointage_heures', ['user_id', 'date_travail']),
+    ('ix_journal_chantier_projet_id_date_entry', 'journal_chantier',
+     ['projet_id', sa.text('date_entry DESC')]),
+    ('ix_jalons_chantier_projet_id', 'jalons_chantier', ['projet_id']),
+)
+
+
+def _existing_indexes() -> set:
+    if op.get_context().as_sql:
+        return set()  # mode --sql : script complet, à relire par le DBA
+    inspector = sa.inspect(op.get_bind())
+    return {
+        index['name']
+        for table in {table for _, table, _ in INDEXES}
+        for index in inspector.get_indexes(table)
+    }
+
+
+def upgrade() -> None:
+    existing = _existing_indexes()
+    # PostgreSQL : CONCURRENTLY, hors transaction, pour ne pas bloquer les écritures
+    # pendant la construction sur des tables déjà volumineuses.
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            if name not in existing:
+                op.create_index(name, table, columns, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
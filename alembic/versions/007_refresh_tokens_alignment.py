@@ -0,0 +1,40 @@
+"""Align refresh_tokens with the model: NOT NULL user_id/revoked, ix_refresh_tokens_id
+
+Revision ID: 007_refresh_tokens_alignment
+Revises: 006_hot_query_indexes
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '007_refresh_tokens_alignment'
+down_revision = '006_hot_query_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Les bases issues de l'ancien create_all ont user_id/revoked nullables et
+    # ix_refresh_tokens_id ; celles issues de 001, l'inverse.
+    inspector = sa.inspect(op.get_bind())
+    nullables = {c['name'] for c in inspector.get_columns('refresh_tokens') if c['nullable']}
+    indexes = {index['name'] for index in inspector.get_indexes('refresh_tokens')}
+
+    if nullables & {'user_id', 'revoked'}:
+        # Un jeton sans utilisateur est inutilisable ; un état de révocation inconnu vaut révoqué
+        op.execute('DELETE FROM refresh_tokens WHERE user_id IS NULL')
+        op.execute(sa.text('UPDATE refresh_tokens SET revoked = :oui WHERE revoked IS NULL').bindparams(oui=True))
+        with op.batch_alter_table('refresh_tokens') as batch_op:
+            batch_op.alter_column('user_id', existing_type=sa.Integer(), nullable=False)
+            batch_op.alter_column(
+                'revoked', existing_type=sa.Boolean(), nullable=False, server_default=sa.false()
+            )
+    if 'ix_refresh_tokens_id' not in indexes:
+        op.create_index(op.f('ix_refresh_tokens_id'), 'refresh_tokens', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_refresh_tokens_id'), table_name='refresh_tokens')
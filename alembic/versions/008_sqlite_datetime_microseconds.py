@@ -0,0 +1,40 @@
+"""Pad SQLite datetimes written by func.now() to the microsecond format
+
+Revision ID: 008_sqlite_datetime_microseconds
+Revises: 007_refresh_tokens_alignment
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '008_sqlite_datetime_microseconds'
+down_revision = '007_refresh_tokens_alignment'
+branch_labels = None
+depends_on = None
+
+# Colonnes autrefois remplies par func.now() (CURRENT_TIMESTAMP : 'AAAA-MM-JJ HH:MM:SS')
+COLUMNS = (
+    ('users', 'date_creation'),
+    ('clients', 'date_creation'),
+    ('projets', 'date_creation'),
+    ('devis', 'date_emission'),
+    ('factures', 'date_emission'),
+    ('journal_chantier', 'date_entry'),
+)
+
+
+def upgrade() -> None:
+    # SQLite stocke les dates en texte : SQLAlchemy écrit toujours '.ffffff'. Un format
+    # unique rend le tri et la comparaison du curseur (keyset) cohérents sur la colonne brute.
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for table, column in COLUMNS:
+        op.execute(
+            f"UPDATE {table} SET {column} = {column} || '.000000' WHERE length({column}) = 19"
+        )
+
+
+def downgrade() -> None:
+    pass  # format équivalent pour SQLAlchemy : rien à restaurer
@@ -0,0 +1,85 @@
+"""
+Commandes d'administration en ligne de commande.
+
+Usage :
+    python -m app.cli recalculate [--statut S] [--projet-id N] [--depuis AAAA-MM-JJ] [--jusqu-au AAAA-MM-JJ] [--dry-run]
+    python -m app.cli compact-tokens [--batch-size N]
+
+compact-tokens est prévu pour une exécution périodique (cron, timer systemd), par ex. :
+    */15 * * * *  cd /app && python -m app.cli compact-tokens
+"""
+import argparse
+import json
+import sys
+from datetime import date
+
+from app.core.database import SessionLocal
+
+
+def recalculate(args: argparse.Namespace) -> int:
+    """Recalcule les totaux des devis filtrés (équivalent de POST /devis/recalculate)."""
+    from app.models.devis import RecalculDevisRequest
+    from app.services import devis_service
+
+    filtre = RecalculDevisRequest(
+        statut=args.statut,
+        projet_id=args.projet_id,
+        date_debut=args.depuis,
+        date_fin=args.jusqu_au,
+        dry_run=args.dry_run,
+    )
+    db = SessionLocal()
+    try:
+        rapport = devis_service.recalculate_devis_totals(db, filtre=filtre)
+    finally:
+        db.close()
+    print(json.dumps(rapport.model_dump(), ensure_ascii=False, indent=2))
+    return 0
+
+
+def compact_tokens(args: argparse.Namespace) -> int:
+    """Supprime par tranches les refresh tokens expirés ou révoqués."""
+    from app.services import user_service
+
+    db = SessionLocal()
+    try:
+        supprimes = user_service.compact_refresh_tokens(db, batch_size=args.batch_size)
+    finally:
+        db.close()
+    print(json.dumps({"refresh_tokens_supprimes": supprimes}))
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    from app.services import user_service
+
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Administration de l'API BTP.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    cmd = commands.add_parser("recalculate", help="Recalcule les totaux des devis (lignes, lots, devis).")
+    cmd.add_argument("--statut", help="ne traiter que les devis de ce statut")
+    cmd.add_argument("--projet-id", type=int, help="ne traiter que les devis de ce projet")
+    cmd.add_argument("--depuis", type=date.fromisoformat, help="date d'émission minimale (incluse)")
+    cmd.add_argument("--jusqu-au", type=date.fromisoformat, help="date d'émission maximale (incluse)")
+    cmd.add_argument("--dry-run", action="store_true", help="compter les écarts sans rien enregistrer")
+    cmd.set_defaults(func=recalculate)
+
+    cmd = commands.add_parser("compact-tokens", help="Supprime les refresh tokens expirés ou révoqués.")
+    cmd.add_argument(
+        "--batch-size",
+        type=int,
+        default=user_service.REFRESH_TOKEN_COMPACTION_BATCH,
+        help="lignes supprimées par transaction",
+    )
+    cmd.set_defaults(func=compact_tokens)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
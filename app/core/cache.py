@@ -0,0 +1,256 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from app.core.config import (
+    DEVIS_CACHE_BACKEND,
+    DEVIS_CACHE_MAX_ENTRIES,
+    DEVIS_CACHE_PATH,
+    DEVIS_CACHE_TTL_SECONDS,
+    USER_CACHE_BACKEND,
+    USER_CACHE_MAX_ENTRIES,
+    USER_CACHE_PATH,
+    USER_CACHE_TTL_SECONDS,
+    TOKEN_CACHE_MAX_ENTRIES,
+)
+
+
+# --- Backends de stockage ---
+
+
+class MemoryCacheBackend:
+    """LRU borné avec expiration, propre au processus (backend par défaut)."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple[float, bytes]]" = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl: float, generation: int) -> None:
+        with self._lock:
+            if generation != self._generation:
+                return  # une invalidation a eu lieu pendant le chargement : valeur peut-être périmée
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def generation(self) -> int:
+        return self._generation
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SqliteCacheBackend:
+    """
+    Cache partagé par tous les workers d'une même machine, dans un fichier SQLite local
+    (mode WAL). Les invalidations faites par un worker sont vues par tous les autres.
+    `touch_on_read=False` : pas d'écriture à chaque lecture (éviction par date d'insertion),
+    pour les caches lus à chaque requête. Le fichier n'est créé qu'au premier accès.
+    """
+
+    def __init__(self, path: str, max_entries: int, touch_on_read: bool = True):
+        self.path = path
+        self.max_entries = max_entries
+        self.touch_on_read = touch_on_read
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            conn.execute("INSERT OR IGNORE INTO meta (name, value) VALUES ('generation', 0)")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[bytes]:
+        conn = self._connect()
+        now = time.time()
+        row = conn.execute(
+            "SELECT value FROM entries WHERE key = ? AND expires_at >= ?", (key, now)
+        ).fetchone()
+        if row is None:
+            return None
+        if self.touch_on_read:
+            conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+        return row[0]
+
+    def set(self, key: str, value: bytes, ttl: float, generation: int) -> None:
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if self._generation(conn) != generation:
+                return  # une invalidation a eu lieu pendant le chargement
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, expires_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, value, now + ttl, now),
+            )
+            conn.execute(
+                "DELETE FROM entries WHERE key IN ("
+                "SELECT key FROM entries ORDER BY expires_at < ?, last_access DESC LIMIT -1 OFFSET ?)",
+                (now, self.max_entries),
+            )
+        finally:
+            conn.execute("COMMIT")
+
+    def delete(self, key: str) -> None:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("UPDATE meta SET value = value + 1 WHERE name = 'generation'")
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+        finally:
+            conn.execute("COMMIT")
+
+    def clear(self) -> None:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("UPDATE meta SET value = value + 1 WHERE name = 'generation'")
+            conn.execute("DELETE FROM entries")
+        finally:
+            conn.execute("COMMIT")
+
+    @staticmethod
+    def _generation(conn: sqlite3.Connection) -> int:
+        return conn.execute("SELECT value FROM meta WHERE name = 'generation'").fetchone()[0]
+
+    def generation(self) -> int:
+        return self._generation(self._connect())
+
+    def __len__(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+
+# --- Cache de réponses ---
+
+
+class ResponseCache:
+    """
+    Cache de réponses sérialisées (bytes) en lecture directe (read-through), avec
+    compteurs de succès/échecs. Le backend mémoire accepte aussi des objets immuables.
+    Les valeurs sont invalidées explicitement par les services à chaque écriture ;
+    le TTL borne la durée de vie dans tous les cas.
+    """
+
+    def __init__(self, name: str, backend, ttl: float):
+        self.name = name
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key) -> Optional[bytes]:
+        value = self.backend.get(str(key))
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def generation(self) -> int:
+        """À lire avant de charger la valeur depuis la base, puis à passer à set()."""
+        return self.backend.generation()
+
+    def set(self, key, value: bytes, generation: int, ttl: Optional[float] = None) -> None:
+        """`ttl` remplace ponctuellement la durée de vie par défaut du cache."""
+        self.backend.set(str(key), value, self.ttl if ttl is None else ttl, generation)
+
+    def invalidate(self, *keys) -> None:
+        for key in keys:
+            self.backend.delete(str(key))
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "name": self.name,
+            "backend": type(self.backend).__name__,
+            "entries": len(self.backend),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+# Registre des caches de l'application (statistiques, métriques)
+CACHES: Dict[str, "ResponseCache"] = {}
+
+
+def register_cache(cache: "ResponseCache") -> "ResponseCache":
+    CACHES[cache.name] = cache
+    return cache
+
+
+def _build_backend(kind: str, path: str, max_entries: int, touch_on_read: bool = True):
+    if kind == "sqlite":
+        return SqliteCacheBackend(path, max_entries, touch_on_read=touch_on_read)
+    if kind == "memory":
+        return MemoryCacheBackend(max_entries)
+    raise ValueError(f"Backend de cache inconnu : {kind}")
+
+
+# Réponses sérialisées de GET /devis/{id}
+devis_cache = register_cache(
+    ResponseCache(
+        "devis",
+        _build_backend(DEVIS_CACHE_BACKEND, DEVIS_CACHE_PATH, DEVIS_CACHE_MAX_ENTRIES),
+        ttl=DEVIS_CACHE_TTL_SECONDS,
+    )
+)
+
+# Utilisateur authentifié (CurrentUser sérialisé en JSON) par sujet de token. Backend
+# "memory" (défaut) : une invalidation (désactivation, suppression, révocation des jetons)
+# n'est vue que par le worker qui écrit, les autres au plus tard après
+# USER_CACHE_TTL_SECONDS ; "sqlite" : vue immédiatement par tous les workers.
+user_cache = register_cache(
+    ResponseCache(
+        "users",
+        _build_backend(USER_CACHE_BACKEND, USER_CACHE_PATH, USER_CACHE_MAX_ENTRIES, touch_on_read=False),
+        ttl=USER_CACHE_TTL_SECONDS,
+    )
+)
+
+# Claims des jetons JWT déjà vérifiés, par empreinte du jeton ; chaque entrée
+# expire à l'`exp` du jeton (ttl fixé à l'insertion).
+token_cache = register_cache(
+    ResponseCache("tokens", MemoryCacheBackend(TOKEN_CACHE_MAX_ENTRIES), ttl=0)
+)
@@ -8,4 +8,73 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 # Configuration de la sécurité 
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
-ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
\ No newline at end of file
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
+
+# Rendu PDF des devis et factures
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR", "./var/pdf_cache")
+PDF_CACHE_MAX_FILES = int(os.getenv("PDF_CACHE_MAX_FILES", 5000))
+# Éviction (parcours du répertoire) une fois toutes les N écritures
+PDF_CACHE_PRUNE_EVERY = int(os.getenv("PDF_CACHE_PRUNE_EVERY", 50))
+PDF_RENDER_WORKERS = int(os.getenv("PDF_RENDER_WORKERS", 2))
+
+# Cache des réponses GET /devis/{id} ("memory" : par processus ; "sqlite" : partagé entre workers d'une machine)
+DEVIS_CACHE_BACKEND = os.getenv("DEVIS_CACHE_BACKEND", "memory")
+DEVIS_CACHE_PATH = os.getenv("DEVIS_CACHE_PATH", "./var/devis_cache.sqlite")
+DEVIS_CACHE_MAX_ENTRIES = int(os.getenv("DEVIS_CACHE_MAX_ENTRIES", 2000))
+DEVIS_CACHE_TTL_SECONDS = int(os.getenv("DEVIS_CACHE_TTL_SECONDS", 300))
+
+# Cache de l'utilisateur authentifié, indexé par le sujet du token. "memory" (défaut) :
+# par processus, une révocation des jetons (token_version) ou une désactivation n'atteint
+# les autres workers qu'après le TTL ; "sqlite" : partagé par les workers de la machine,
+# à activer quand l'API tourne avec plusieurs workers.
+USER_CACHE_BACKEND = os.getenv("USER_CACHE_BACKEND", "memory")
+USER_CACHE_PATH = os.getenv("USER_CACHE_PATH", "./var/user_cache.sqlite")
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", 10000))
+USER_CACHE_TTL_SECONDS = int(os.getenv("USER_CACHE_TTL_SECONDS", 60))
+
+# Hachage des mots de passe (bcrypt) : coût et pool de processus dédié
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+# Demandes admises en attente au-delà des workers occupés ; au-delà : 503 immédiat
+PASSWORD_HASH_QUEUE_LIMIT = int(os.getenv("PASSWORD_HASH_QUEUE_LIMIT", 32))
+
+# Mémoïsation des jetons JWT déjà vérifiés (0 : désactivée)
+TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", 10000))
+
+# Pool de connexions SQL (QueuePool)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))  # attente max d'une connexion (s)
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))  # âge max d'une connexion (s), -1 : jamais
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+# Durée max d'une requête SQL côté serveur (PostgreSQL), 0 : pas de limite
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", 30000))
+
+# Moteur asynchrone (routes async) : par défaut dérivé de DATABASE_URL
+# (postgresql -> postgresql+asyncpg, sqlite -> sqlite+aiosqlite)
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")
+
+# Réplique en lecture (optionnelle) : les GET des routeurs métier y sont routés
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
+# Après une écriture, les lectures du même client restent sur le primaire pendant ce délai (s)
+DB_REPLICA_STICKY_SECONDS = float(os.getenv("DB_REPLICA_STICKY_SECONDS", 5))
+
+# Vérifications au démarrage (hook lifespan) : base joignable, schéma à la dernière migration
+STARTUP_CHECK_TIMEOUT_SECONDS = float(os.getenv("STARTUP_CHECK_TIMEOUT_SECONDS", 5))
+# true : un échec bloque le démarrage ; false : simple avertissement (le worker démarre)
+STARTUP_CHECK_STRICT = os.getenv("STARTUP_CHECK_STRICT", "false").lower() == "true"
+
+# Instrumentation par requête (en-tête Server-Timing, journalisation des lenteurs)
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "true").lower() == "true"
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", 500))  # 0 : désactivé
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", 100))  # 0 : désactivé
+
+# Métriques Prometheus (GET /metrics). Plusieurs workers : définir PROMETHEUS_MULTIPROC_DIR
+# (répertoire local vidé avant le lancement du serveur), lu directement par prometheus_client.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+# Fréquence max (s) de recopie des statistiques du pool SQL et des caches dans les métriques
+METRICS_REFRESH_SECONDS = float(os.getenv("METRICS_REFRESH_SECONDS", 5))
+
+# Sérialisation des réponses volumineuses (devis, listes de devis) : true, copie directe des
+# objets chargés et écriture orjson ; false, validation Pydantic complète (TypeAdapter).
+FAST_SERIALIZATION = os.getenv("FAST_SERIALIZATION", "true").lower() == "true"
@@ -1,18 +1,138 @@
-from sqlalchemy import create_engine
+import threading
+import time
+
+from fastapi import Request
+from sqlalchemy import Column, Integer, create_engine, event, exc, literal_column, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from app.core.config import DATABASE_URL # Importe l'URL de connexion
+from sqlalchemy.pool import QueuePool
+from app.core.config import (  # Importe l'URL de connexion et les réglages du pool
+    ASYNC_DATABASE_URL,
+    DATABASE_REPLICA_URL,
+    DATABASE_URL,
+    DB_MAX_OVERFLOW,
+    DB_POOL_PRE_PING,
+    DB_POOL_RECYCLE,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT,
+    DB_REPLICA_STICKY_SECONDS,
+    DB_STATEMENT_TIMEOUT_MS,
+)
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool qui mesure l'attente d'une connexion (file d'attente du pool)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.timeouts = 0
+
+    def _do_get(self):
+        debut = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            attente = time.perf_counter() - debut
+            with self._stats_lock:
+                self.checkouts += 1
+                self.wait_total += attente
+                self.wait_max = max(self.wait_max, attente)
+
+
+def _engine_options(url: str) -> dict:
+    if url and url.startswith("sqlite") and ":memory:" in url:
+        return {}  # base en mémoire : pool dédié de SQLAlchemy (StaticPool/SingletonThreadPool)
+    return {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+def _set_statement_timeout(dbapi_connection, connection_record):
+    # Appliqué à chaque nouvelle connexion : une requête bloquée ne retient pas un worker
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"SET statement_timeout = {int(DB_STATEMENT_TIMEOUT_MS)}")
+    cursor.close()
+    dbapi_connection.commit()
+
+
+def _create_engine(url: str):
+    moteur = create_engine(url, **_engine_options(url))
+    if DB_STATEMENT_TIMEOUT_MS > 0 and moteur.dialect.name == "postgresql":
+        event.listen(moteur, "connect", _set_statement_timeout)
+    return moteur
+
 
 # Crée le moteur de base de données (engine)
 # Si DATABASE_URL est None, l'erreur ArgumentError apparaît ici. La correction de docker-compose.yml résout cela.
-engine = create_engine(DATABASE_URL) 
+engine = _create_engine(DATABASE_URL)
+
+# Réplique en lecture : None si DATABASE_REPLICA_URL n'est pas défini (tout va au primaire)
+replica_engine = _create_engine(DATABASE_REPLICA_URL) if DATABASE_REPLICA_URL else None
+
+
+def _pool_status(pool) -> dict:
+    status = {"pool": type(pool).__name__, "status": pool.status()}
+    if isinstance(pool, QueuePool):
+        status.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            overflow=max(pool.overflow(), 0),
+            max_overflow=pool._max_overflow,
+            timeout_s=pool.timeout(),
+        )
+    if isinstance(pool, InstrumentedQueuePool):
+        status.update(
+            checkouts=pool.checkouts,
+            wait_total_s=round(pool.wait_total, 6),
+            wait_avg_ms=round(pool.wait_total / pool.checkouts * 1000, 3) if pool.checkouts else 0.0,
+            wait_max_ms=round(pool.wait_max * 1000, 3),
+            timeouts=pool.timeouts,
+        )
+    return status
+
+
+def pool_status() -> dict:
+    """État du pool de connexions (par worker) : occupation, débordement, attente."""
+    status = _pool_status(engine.pool)
+    if replica_engine is not None:
+        status["replica"] = _pool_status(replica_engine.pool)
+    return status
 
 # Crée une fabrique de sessions
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Sessions de lecture sur la réplique (info["replica"] : la session peut être en retard)
+ReplicaSessionLocal = sessionmaker(
+    autocommit=False, autoflush=False, bind=replica_engine or engine,
+    info={"replica": replica_engine is not None},
+)
+
 # Base déclarative pour les modèles SQLAlchemy (Base)
 Base = declarative_base()
 
+# Version de ligne : 1 à l'insertion, puis +1 à chaque UPDATE (ORM ou Core) qui ne la
+# fixe pas lui-même. Sert à dériver les ETags sans recharger l'objet.
+def version_column():
+    return Column(
+        Integer, nullable=False, default=1, server_default="1",
+        onupdate=literal_column("version") + 1,
+    )
+
 # Fonction utilitaire pour obtenir la session de la DB (dépendance FastAPI)
 def get_db():
     db = SessionLocal()
@@ -21,4 +141,95 @@ def get_db():
         yield db 
     finally:
         # Assure que la connexion est fermée
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+# --- Lectures sur la réplique ---
+# Read-your-writes : après une écriture réussie, un cookie fixe l'échéance jusqu'à
+# laquelle les lectures du client restent sur le primaire (la réplique peut être en
+# retard). L'en-tête X-Read-Primary: 1 force le primaire pour une requête donnée.
+READ_PRIMARY_COOKIE = "read_primary_until"
+READ_PRIMARY_HEADER = "X-Read-Primary"
+
+
+def read_primary_until() -> int:
+    """Échéance (timestamp) à poser après une écriture."""
+    return int(time.time() + DB_REPLICA_STICKY_SECONDS) + 1
+
+
+def reads_from_primary(request: Request) -> bool:
+    if replica_engine is None or request.headers.get(READ_PRIMARY_HEADER) == "1":
+        return True
+    try:
+        return float(request.cookies.get(READ_PRIMARY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def read_sessionmaker(request: Request) -> sessionmaker:
+    """Fabrique de sessions pour une lecture : réplique, sauf read-your-writes."""
+    return SessionLocal if reads_from_primary(request) else ReplicaSessionLocal
+
+
+def is_replica_session(db) -> bool:
+    return db.info.get("replica", False)
+
+
+# Dépendance FastAPI des routes GET en lecture seule
+def get_read_db(request: Request):
+    db = read_sessionmaker(request)()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# --- Moteur asynchrone (routes `async def`) ---
+# Créé au premier usage : le pilote (asyncpg, aiosqlite) n'est importé que si une
+# route asynchrone accède à la base.
+_async_engine: AsyncEngine | None = None
+
+# expire_on_commit=False : après commit, un attribut expiré serait rechargé hors de
+# la boucle (MissingGreenlet) ; les objets restent lisibles par la sérialisation.
+AsyncSessionLocal = async_sessionmaker(autoflush=False, expire_on_commit=False)
+
+
+def async_database_url(url: str) -> str:
+    """URL de la même base avec un pilote asynchrone (asyncpg ou aiosqlite)."""
+    if ASYNC_DATABASE_URL:
+        return ASYNC_DATABASE_URL
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend == "postgresql":
+        parsed = parsed.set(drivername="postgresql+asyncpg")
+    elif backend == "sqlite":
+        parsed = parsed.set(drivername="sqlite+aiosqlite")
+    return parsed.render_as_string(hide_password=False)
+
+
+def get_async_engine() -> AsyncEngine:
+    global _async_engine
+    if _async_engine is None:
+        url = async_database_url(DATABASE_URL)
+        options = _engine_options(url)
+        options.pop("poolclass", None)  # pool asynchrone par défaut, mêmes réglages
+        if DB_STATEMENT_TIMEOUT_MS > 0 and make_url(url).get_backend_name() == "postgresql":
+            options["connect_args"] = {
+                "server_settings": {"statement_timeout": str(int(DB_STATEMENT_TIMEOUT_MS))}
+            }
+        _async_engine = create_async_engine(url, **options)
+    return _async_engine
+
+
+async def dispose_async_engine() -> None:
+    """Ferme les connexions du moteur asynchrone (arrêt de l'application)."""
+    global _async_engine
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+
+
+# Dépendance FastAPI des routes asynchrones : aucune I/O SQL bloquante sur la boucle
+async def get_async_db():
+    async with AsyncSessionLocal(bind=get_async_engine()) as db:
+        yield db
\ No newline at end of file
@@ -0,0 +1,41 @@
+import hashlib
+from typing import Iterable, Optional
+
+from fastapi import Request, Response, status
+
+
+def make_etag(*parts) -> str:
+    """ETag fort dérivé d'éléments stables (type de ressource, id, version de ligne...)."""
+    digest = hashlib.sha1(":".join(map(str, parts)).encode("utf-8")).hexdigest()
+    return f'"{digest}"'
+
+
+def make_list_etag(kind: str, rows: Iterable) -> str:
+    """ETag d'une page de liste : dépend des (id, version) de chaque élément, dans l'ordre."""
+    return make_etag(kind, *(f"{row.id}.{row.version}" for row in rows))
+
+
+def _matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Comparaison faible (RFC 9110 §13.1.2) : un client peut renvoyer W/"..."
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag in candidates
+
+
+def check_etag(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """
+    Si l'ETag correspond à If-None-Match, renvoie une réponse 304 vide (le corps n'est
+    ni chargé ni sérialisé). Sinon, ajoute l'ETag à la réponse et renvoie None.
+    """
+    if _matches(request, etag):
+        headers = {"ETag": etag}
+        for name, value in response.headers.items():
+            if name.lower() not in ("content-length", "content-type"):
+                headers[name] = value
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers["ETag"] = etag
+    return None
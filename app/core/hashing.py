@@ -0,0 +1,86 @@
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Optional
+
+from fastapi import HTTPException, status
+
+from app.core.config import PASSWORD_HASH_QUEUE_LIMIT, PASSWORD_HASH_WORKERS
+from app.core.security import get_password_hash, verify_password
+
+# Pool de processus réservé à bcrypt (créé au premier hachage) : un pic de connexions
+# consomme ces processus, pas le pool de threads ni la boucle du serveur.
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+# Demandes en cours (en calcul + en attente), bornées par workers + file d'attente
+_pending = 0
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=PASSWORD_HASH_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+
+def shutdown_pool() -> None:
+    """Arrête le pool de hachage (arrêt de l'application)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def pending() -> int:
+    """Nombre de hachages en cours ou en attente (supervision)."""
+    return _pending
+
+
+def _release(_future: Future) -> None:
+    global _pending
+    with _pool_lock:
+        _pending -= 1
+
+
+def _submit(fn, *args) -> Future:
+    """
+    Soumet un calcul bcrypt au pool, ou répond 503 tout de suite si la file est pleine :
+    mieux vaut un refus rapide que des connexions qui s'accumulent jusqu'au timeout.
+    """
+    global _pending
+    pool = _get_pool()
+    with _pool_lock:
+        if _pending >= PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE_LIMIT:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Service d'authentification saturé, veuillez réessayer.",
+                headers={"Retry-After": "1"},
+            )
+        _pending += 1
+    try:
+        future = pool.submit(fn, *args)
+    except Exception:
+        _release(None)
+        raise
+    future.add_done_callback(_release)
+    return future
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password exécuté dans le pool, sans bloquer la boucle."""
+    return await asyncio.wrap_future(_submit(verify_password, plain_password, hashed_password))
+
+
+async def hash_password_async(password: str) -> str:
+    """get_password_hash exécuté dans le pool, sans bloquer la boucle."""
+    return await asyncio.wrap_future(_submit(get_password_hash, password))
+
+
+def hash_password(password: str) -> str:
+    """get_password_hash exécuté dans le pool, pour le code synchrone (threads de FastAPI)."""
+    return _submit(get_password_hash, password).result()
@@ -0,0 +1,210 @@
+"""
+Instrumentation par requête : nombre de requêtes SQL, temps base de données,
+temps de sérialisation et temps total.
+
+- Les événements du moteur SQLAlchemy (tous les moteurs, réplique et moteur
+  asynchrone compris) alimentent les compteurs de la requête HTTP en cours,
+  retrouvée par une ContextVar (propagée au threadpool des routes `def`).
+- TimedRoute note le gabarit de la route (/devis/{devis_id}) et mesure la
+  sérialisation (du retour de l'endpoint à la réponse construite).
+- RequestTimingMiddleware (ASGI pur) ajoute l'en-tête Server-Timing et journalise
+  les requêtes et les requêtes SQL lentes.
+
+Hors requête HTTP (CLI, scripts), les événements SQL ne font qu'un accès à la
+ContextVar.
+"""
+import functools
+import inspect
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import SERVER_TIMING_ENABLED, SLOW_QUERY_MS, SLOW_REQUEST_MS
+
+logger = logging.getLogger(__name__)
+
+
+class RequestStats:
+    """Compteurs d'une requête HTTP."""
+
+    __slots__ = ("method", "path", "route", "queries", "db_time", "serialize_time", "endpoint_done")
+
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.route: Optional[str] = None  # gabarit, connu une fois la route résolue
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialize_time = 0.0
+        self.endpoint_done: Optional[float] = None
+
+    @property
+    def route_label(self) -> str:
+        return self.route or self.path
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def current_stats() -> Optional[RequestStats]:
+    return _current.get()
+
+
+@contextmanager
+def timed_serialization():
+    """Pour les routes qui sérialisent elles-mêmes (réponse construite à la main)."""
+    debut = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats = _current.get()
+        if stats is not None:
+            stats.serialize_time += time.perf_counter() - debut
+
+
+# --- Événements SQL (sur la classe Engine : tous les moteurs) ---
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is None:
+        return
+    starts = conn.info.get("query_start")
+    if not starts:
+        return
+    duree = time.perf_counter() - starts.pop()
+    stats.queries += 1
+    stats.db_time += duree
+    if SLOW_QUERY_MS and duree * 1000 >= SLOW_QUERY_MS:
+        logger.warning(
+            "Requête SQL lente : %.1f ms sur %s %s : %s",
+            duree * 1000, stats.method, stats.route_label, " ".join(statement.split())[:500],
+        )
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context):
+    # Requête en échec : after_cursor_execute n'est pas appelé, on dépile ici le départ
+    # empilé par before_cursor_execute (sinon la pile grossit avec la connexion du pool).
+    conn = exception_context.connection
+    if conn is None or exception_context.statement is None:
+        return
+    starts = conn.info.get("query_start")
+    if not starts:
+        return
+    duree = time.perf_counter() - starts.pop()
+    stats = _current.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_time += duree
+
+
+# --- Route : gabarit et temps de sérialisation ---
+
+
+def _timed_endpoint(endpoint):
+    """Marque la fin de l'endpoint ; ce qui suit jusqu'à la réponse est la sérialisation."""
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            result = await endpoint(*args, **kwargs)
+            _mark_endpoint_done()
+            return result
+    else:
+        @functools.wraps(endpoint)
+        def wrapper(*args, **kwargs):
+            result = endpoint(*args, **kwargs)
+            _mark_endpoint_done()
+            return result
+    return wrapper
+
+
+def _mark_endpoint_done() -> None:
+    stats = _current.get()
+    if stats is not None:
+        stats.endpoint_done = time.perf_counter()
+
+
+class TimedRoute(APIRoute):
+    """APIRoute instrumentée (route_class des routeurs de l'application)."""
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, _timed_endpoint(endpoint), **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+        route_path = self.path_format
+
+        async def timed_handler(request):
+            stats = _current.get()
+            if stats is not None:
+                stats.route = route_path
+            response = await handler(request)
+            if stats is not None and stats.endpoint_done is not None:
+                stats.serialize_time += time.perf_counter() - stats.endpoint_done
+            return response
+
+        return timed_handler
+
+
+# --- Middleware ---
+
+
+class RequestTimingMiddleware:
+    """En-tête Server-Timing (db, serialize, total) et journalisation des requêtes lentes."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope["method"], scope["path"])
+        token = _current.set(stats)
+        debut = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if SERVER_TIMING_ENABLED:
+                    total = (time.perf_counter() - debut) * 1000
+                    valeur = (
+                        f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} req", '
+                        f"serialize;dur={stats.serialize_time * 1000:.1f}, "
+                        f"total;dur={total:.1f}"
+                    )
+                    message.setdefault("headers", [])
+                    message["headers"] = list(message["headers"]) + [
+                        (b"server-timing", valeur.encode("latin-1"))
+                    ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            duree = (time.perf_counter() - debut) * 1000
+            if SLOW_REQUEST_MS and duree >= SLOW_REQUEST_MS:
+                logger.warning(
+                    "Requête lente : %s %s -> %s en %.0f ms (%d requête(s) SQL, %.0f ms en base, "
+                    "%.0f ms de sérialisation)",
+                    stats.method, stats.route_label, status_code, duree,
+                    stats.queries, stats.db_time * 1000, stats.serialize_time * 1000,
+                )
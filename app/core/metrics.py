@@ -0,0 +1,175 @@
+"""
+Métriques Prometheus de l'application (GET /metrics, format texte).
+
+- Latence par route (histogramme), requêtes en cours, réponses par code HTTP ;
+- pool de connexions SQL (primaire et réplique) et caches applicatifs.
+
+Plusieurs workers uvicorn : avec PROMETHEUS_MULTIPROC_DIR, chaque processus écrit
+ses valeurs dans ce répertoire et /metrics agrège tous les workers, quel que soit
+celui qui répond. Le répertoire doit être vidé avant le lancement du serveur.
+
+Ratio de succès d'un cache, tous workers confondus :
+    sum by (cache) (rate(app_cache_requests_total{result="hit"}[5m]))
+      / sum by (cache) (rate(app_cache_requests_total[5m]))
+"""
+import os
+import threading
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+from app.core.cache import CACHES
+from app.core.config import METRICS_REFRESH_SECONDS
+from app.core.database import pool_status
+from app.core.instrumentation import current_stats
+
+MULTIPROCESS = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+# Route non résolue (404, méthodes non gérées) : un seul libellé, cardinalité bornée
+UNMATCHED_ROUTE = "<unmatched>"
+
+REQUEST_LATENCY = Histogram(
+    "app_http_request_duration_seconds",
+    "Durée des requêtes HTTP par route (gabarit) et méthode.",
+    ["method", "route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "app_http_requests_in_progress",
+    "Requêtes HTTP en cours de traitement.",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+RESPONSES = Counter(
+    "app_http_responses_total",
+    "Réponses HTTP par route, méthode et code de statut.",
+    ["method", "route", "status"],
+)
+
+DB_POOL_CHECKED_OUT = Gauge(
+    "app_db_pool_checked_out", "Connexions SQL prises.", ["pool"], multiprocess_mode="livesum"
+)
+DB_POOL_SIZE = Gauge(
+    "app_db_pool_size", "Taille du pool SQL.", ["pool"], multiprocess_mode="livesum"
+)
+DB_POOL_OVERFLOW = Gauge(
+    "app_db_pool_overflow", "Connexions SQL en débordement.", ["pool"], multiprocess_mode="livesum"
+)
+DB_POOL_CHECKOUTS = Counter(
+    "app_db_pool_checkouts", "Connexions SQL obtenues du pool.", ["pool"]
+)
+DB_POOL_WAIT = Counter(
+    "app_db_pool_wait_seconds", "Temps cumulé d'attente d'une connexion SQL.", ["pool"]
+)
+DB_POOL_TIMEOUTS = Counter(
+    "app_db_pool_timeouts", "Attentes de connexion SQL abandonnées (pool_timeout).", ["pool"]
+)
+CACHE_REQUESTS = Counter(
+    "app_cache_requests", "Lectures des caches applicatifs, par résultat.", ["cache", "result"]
+)
+
+# Les compteurs internes (pool, caches) sont cumulés par processus : on reporte l'écart
+# depuis la dernière recopie, ce qui garde des compteurs Prometheus monotones.
+_refresh_lock = threading.Lock()
+_last_refresh = 0.0
+_reported: dict = {}
+
+
+def _report(counter, key: tuple, value: float) -> None:
+    child = counter.labels(*key)  # série exposée dès la première recopie, même à 0
+    delta = value - _reported.get((counter, key), 0)
+    if delta > 0:
+        child.inc(delta)
+        _reported[(counter, key)] = value
+
+
+def refresh(force: bool = False) -> None:
+    """Recopie pool SQL et caches dans les métriques (au plus tous les METRICS_REFRESH_SECONDS)."""
+    global _last_refresh
+    now = time.monotonic()
+    if not force and now - _last_refresh < METRICS_REFRESH_SECONDS:
+        return
+    if not _refresh_lock.acquire(blocking=False):
+        return  # recopie déjà en cours dans un autre thread
+    try:
+        _last_refresh = now
+        status = pool_status()
+        pools = {"primary": status}
+        if "replica" in status:
+            pools["replica"] = status["replica"]
+        for name, pool in pools.items():
+            if "size" not in pool:
+                continue  # pool sans file d'attente (SQLite en mémoire)
+            DB_POOL_CHECKED_OUT.labels(name).set(pool["checked_out"])
+            DB_POOL_SIZE.labels(name).set(pool["size"])
+            DB_POOL_OVERFLOW.labels(name).set(pool["overflow"])
+            if "checkouts" in pool:
+                _report(DB_POOL_CHECKOUTS, (name,), pool["checkouts"])
+                _report(DB_POOL_WAIT, (name,), pool["wait_total_s"])
+                _report(DB_POOL_TIMEOUTS, (name,), pool["timeouts"])
+        for cache in CACHES.values():
+            _report(CACHE_REQUESTS, (cache.name, "hit"), cache.hits)
+            _report(CACHE_REQUESTS, (cache.name, "miss"), cache.misses)
+    finally:
+        _refresh_lock.release()
+
+
+def render() -> tuple[bytes, str]:
+    """Corps et type de contenu de /metrics (tous les workers en mode multiprocessus)."""
+    refresh(force=True)
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead() -> None:
+    """Arrêt du worker : ses jauges « live » ne comptent plus dans l'agrégat."""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+class MetricsMiddleware:
+    """
+    Observe chaque requête HTTP. À placer à l'intérieur de RequestTimingMiddleware,
+    dont il lit le gabarit de route (current_stats).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+        debut = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_progress = REQUESTS_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            in_progress.dec()
+            stats = current_stats()
+            route = stats.route if stats is not None and stats.route else UNMATCHED_ROUTE
+            REQUEST_LATENCY.labels(method, route).observe(time.perf_counter() - debut)
+            RESPONSES.labels(method, route, str(status_code)).inc()
+            refresh()
@@ -0,0 +1,65 @@
+import base64
+import json
+from datetime import date, datetime
+from typing import Any, List, Optional
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Query
+
+# En-tête renvoyé par les endpoints de liste : curseur de la page suivante.
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(sort_value: Any, row_id: int) -> str:
+    """Encode la position (valeur de tri, id) en curseur opaque."""
+    if isinstance(sort_value, (datetime, date)):
+        sort_value = sort_value.isoformat()
+    raw = json.dumps([sort_value, row_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_column) -> tuple[Any, int]:
+    """Décode un curseur opaque en (valeur de tri, id), typés selon la colonne de tri."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sort_value, row_id = json.loads(raw)
+        python_type = sort_column.type.python_type
+        if sort_value is not None and python_type in (datetime, date):
+            sort_value = python_type.fromisoformat(sort_value)
+        return sort_value, int(row_id)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Curseur de pagination invalide."
+        ) from e
+
+
+def paginate(
+    query: Query,
+    sort_column,
+    id_column,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+) -> List:
+    """
+    Applique un ordre stable (colonne de tri, id) et la pagination.
+    Avec un curseur, la page commence juste après la position encodée (keyset) :
+    le coût ne dépend plus de la profondeur et les insertions en cours de
+    parcours ne provoquent ni doublon ni trou. Sans curseur, `skip` reste
+    accepté pour la compatibilité.
+    """
+    query = query.order_by(sort_column, id_column)
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor, sort_column)
+        query = query.filter(tuple_(sort_column, id_column) > (sort_value, row_id))
+    elif skip:
+        query = query.offset(skip)
+    return query.limit(limit).all()
+
+
+def set_next_cursor(response: Response, items: List, limit: int, sort_attr: str) -> None:
+    """Renseigne l'en-tête X-Next-Cursor si la page est pleine (il peut rester des lignes)."""
+    if items and len(items) >= limit:
+        last = items[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(getattr(last, sort_attr), last.id)
@@ -0,0 +1,47 @@
+from contextlib import contextmanager
+from typing import Iterator, List
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.database import engine as default_engine
+
+
+class QueryCounter:
+    """Compte les requêtes SQL envoyées par un moteur pendant un bloc `with`."""
+
+    def __init__(self, engine: Engine = default_engine):
+        self.engine = engine
+        self.statements: List[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self) -> "QueryCounter":
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        event.remove(self.engine, "before_cursor_execute", self._on_execute)
+
+
+@contextmanager
+def assert_max_queries(maximum: int, engine: Engine = default_engine) -> Iterator[QueryCounter]:
+    """
+    Échoue si le bloc exécute plus de `maximum` requêtes SQL.
+    Utilisé dans les vérifications pour qu'un N+1 ne puisse pas revenir :
+
+        with assert_max_queries(5):
+            client.get("/devis/?limit=100", headers=headers)
+    """
+    with QueryCounter(engine) as counter:
+        yield counter
+    if counter.count > maximum:
+        detail = "\n".join(f"  {i}. {sql}" for i, sql in enumerate(counter.statements, 1))
+        raise AssertionError(
+            f"{counter.count} requêtes SQL exécutées (maximum autorisé : {maximum}) :\n{detail}"
+        )
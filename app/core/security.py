@@ -1,8 +1,13 @@
+import hashlib
 import os
+import secrets
+import time
 import bcrypt  # On utilise directement bcrypt pour éviter le bug
 from datetime import datetime, timedelta
 from typing import Any, Union
 from jose import jwt
+from app.core.cache import token_cache
+from app.core.config import BCRYPT_ROUNDS, TOKEN_CACHE_MAX_ENTRIES
 
 # Configuration JWT
 SECRET_KEY = os.getenv("SECRET_KEY", "CLE_SUPER_SECRETE_POUR_LE_DEVELOPPEMENT_12345")
@@ -19,14 +24,21 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     except Exception:
         return False
 
-def get_password_hash(password: str) -> str:
+def get_password_hash(password: str, rounds: int = BCRYPT_ROUNDS) -> str:
     """Génère un hash propre sans passer par passlib."""
     pwd_bytes = password.encode('utf-8')
-    # On génère le sel et le hash
-    salt = bcrypt.gensalt()
+    # On génère le sel (au coût configuré) et le hash
+    salt = bcrypt.gensalt(rounds=rounds)
     hashed = bcrypt.hashpw(pwd_bytes, salt)
     return hashed.decode('utf-8')
 
+def password_needs_rehash(hashed_password: str, rounds: int = BCRYPT_ROUNDS) -> bool:
+    """Vrai si le hash n'a pas été calculé au coût bcrypt actuel (format $2b$<coût>$...)."""
+    try:
+        return int(hashed_password.split('$')[2]) != rounds
+    except (AttributeError, IndexError, ValueError):
+        return True
+
 def create_access_token(data: dict, expires_delta: Union[timedelta, None] = None) -> str:
     """Génère un jeton JWT (inchangé)."""
     to_encode = data.copy()
@@ -39,11 +51,37 @@ def create_refresh_token(data: dict, expires_delta: Union[timedelta, None] = Non
     """Génère un refresh token JWT avec une durée longue."""
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS))
-    to_encode.update({"exp": expire, "type": "refresh"})
+    # jti aléatoire : deux jetons émis dans la même seconde restent distincts
+    to_encode.update({"exp": expire, "type": "refresh", "jti": secrets.token_urlsafe(16)})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
+def hash_refresh_token(token: str) -> str:
+    """Empreinte stockée en base à la place du refresh token (jeton aléatoire signé : SHA-256 suffit)."""
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
 def decode_access_token(token: str) -> Union[dict, None]:
-    """Décode un jeton JWT (inchangé)."""
+    """
+    Décode un jeton JWT. La signature n'est vérifiée qu'une fois par jeton : les
+    claims vérifiés sont mémorisés (clé = SHA-256 du jeton) jusqu'à leur `exp`.
+    """
+    if TOKEN_CACHE_MAX_ENTRIES <= 0:
+        return _decode_and_verify(token)
+
+    key = hashlib.sha256(token.encode('utf-8')).hexdigest()
+    claims = token_cache.get(key)
+    if claims is not None:
+        return dict(claims)
+
+    generation = token_cache.generation()
+    payload = _decode_and_verify(token)
+    exp = payload.get("exp") if payload else None
+    if isinstance(exp, (int, float)):
+        ttl = exp - time.time()
+        if ttl > 0:
+            token_cache.set(key, dict(payload), generation, ttl=ttl)
+    return payload
+
+def _decode_and_verify(token: str) -> Union[dict, None]:
     try:
         return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     except Exception:
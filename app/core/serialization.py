@@ -0,0 +1,123 @@
+"""
+Sérialisation JSON des réponses volumineuses (devis de milliers de lignes, listes).
+
+Le chemin standard de FastAPI (response_model) valide les objets ORM attribut par
+attribut (from_attributes) avant d'écrire le JSON : sur un devis de 2 000 lignes,
+cette validation coûte plusieurs fois l'écriture elle-même. Or une réponse issue
+de la base n'a pas besoin d'être revalidée.
+
+- ResponseSerializer : plan de copie dérivé des champs du modèle de réponse
+  (construit une fois par modèle), qui lit les attributs déjà chargés et écrit
+  le JSON avec orjson. Les clés et leur ordre sont ceux du modèle.
+- adapter() : TypeAdapter Pydantic construits une fois et réutilisés ; chemin
+  validant, utilisé quand FAST_SERIALIZATION=false.
+
+Mesures : python -m benchmarks.bench_serialization
+"""
+import functools
+import typing
+from typing import Any, List, Optional, Union
+
+import orjson
+from fastapi import Response, status
+from pydantic import BaseModel, TypeAdapter
+from pydantic_core import PydanticUndefined, to_jsonable_python
+
+from app.core.config import FAST_SERIALIZATION
+from app.core.instrumentation import timed_serialization
+
+_NO_DEFAULT = object()
+
+
+def _model_in(annotation) -> tuple[Optional[type], bool]:
+    """(modèle imbriqué, liste ?) d'une annotation : Model, Optional[Model], List[Model]."""
+    origin = typing.get_origin(annotation)
+    if origin is Union:
+        args = [a for a in typing.get_args(annotation) if a is not type(None)]
+        return _model_in(args[0]) if len(args) == 1 else (None, False)
+    if origin in (list, List):
+        (item,) = typing.get_args(annotation) or (Any,)
+        model, _ = _model_in(item)
+        return model, model is not None
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation, False
+    return None, False
+
+
+class ResponseSerializer:
+    """Copie un objet (ORM ou autre) selon les champs d'un modèle de réponse, puis JSON (orjson)."""
+
+    __slots__ = ("model", "_fields")
+
+    def __init__(self, model: type[BaseModel]):
+        decorators = model.__pydantic_decorators__
+        if model.model_computed_fields or decorators.field_serializers or decorators.model_serializers:
+            raise TypeError(f"{model.__name__} : sérialiseurs personnalisés non pris en charge")
+        fields = []
+        for name, field in model.model_fields.items():
+            if field.serialization_alias or (field.alias and field.alias != name):
+                raise TypeError(f"{model.__name__}.{name} : alias non pris en charge")
+            nested, many = _model_in(field.annotation)
+            default = _NO_DEFAULT if field.default is PydanticUndefined else field.default
+            fields.append((name, serializer(nested) if nested else None, many, default))
+        self.model = model
+        self._fields = tuple(fields)
+
+    def to_dict(self, obj) -> dict:
+        # Lecture directe de __dict__ (valeurs déjà chargées) ; getattr sinon (chargement différé).
+        loaded = obj.__dict__
+        out = {}
+        for name, nested, many, default in self._fields:
+            if name in loaded:
+                value = loaded[name]
+            elif default is _NO_DEFAULT:
+                value = getattr(obj, name)
+            else:
+                value = getattr(obj, name, default)
+            if nested is not None and value is not None:
+                value = [nested.to_dict(item) for item in value] if many else nested.to_dict(value)
+            out[name] = value
+        return out
+
+    def dumps(self, obj) -> bytes:
+        return orjson.dumps(self.to_dict(obj), default=to_jsonable_python)
+
+    def dumps_many(self, objs) -> bytes:
+        return orjson.dumps([self.to_dict(obj) for obj in objs], default=to_jsonable_python)
+
+
+@functools.lru_cache(maxsize=None)
+def serializer(model: type[BaseModel]) -> ResponseSerializer:
+    return ResponseSerializer(model)
+
+
+@functools.lru_cache(maxsize=None)
+def adapter(tp) -> TypeAdapter:
+    """TypeAdapter de `tp` (ex. List[DevisResponse]), construit une seule fois."""
+    return TypeAdapter(tp)
+
+
+def dump_json(model: type[BaseModel], obj, many: bool = False) -> bytes:
+    """JSON de `obj` (ou de la liste `obj` si many) selon le modèle de réponse `model`."""
+    with timed_serialization():
+        if FAST_SERIALIZATION:
+            s = serializer(model)
+            return s.dumps_many(obj) if many else s.dumps(obj)
+        ta = adapter(List[model] if many else model)
+        return ta.dump_json(ta.validate_python(obj))
+
+
+def json_response(
+    body: bytes, response: Optional[Response] = None, status_code: int = status.HTTP_200_OK
+) -> Response:
+    """
+    Réponse JSON déjà sérialisée. Reprend les en-têtes posés sur la réponse injectée
+    `response` (ETag, X-Next-Cursor...), que FastAPI ne fusionne pas quand la route
+    renvoie elle-même un objet Response.
+    """
+    resultat = Response(content=body, media_type="application/json", status_code=status_code)
+    if response is not None:
+        for name, value in response.headers.items():
+            if name.lower() not in ("content-length", "content-type"):
+                resultat.headers.append(name, value)
+    return resultat
@@ -0,0 +1,55 @@
+import asyncio
+import logging
+from pathlib import Path
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import text
+
+from app.core.config import STARTUP_CHECK_STRICT, STARTUP_CHECK_TIMEOUT_SECONDS
+from app.core.database import engine
+
+logger = logging.getLogger(__name__)
+
+# alembic.ini à la racine du projet (à côté du dossier app/)
+ALEMBIC_INI = Path(__file__).resolve().parents[2] / "alembic.ini"
+
+
+def _check_database() -> list[str]:
+    """Base joignable et schéma à la dernière révision Alembic. Renvoie les anomalies."""
+    # Import local : Alembic n'est chargé qu'au démarrage, pas à l'import de l'application
+    from alembic.config import Config
+    from alembic.runtime.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+        current = set(MigrationContext.configure(connection).get_current_heads())
+    if not ALEMBIC_INI.exists():
+        return [f"{ALEMBIC_INI} introuvable : révision du schéma non vérifiée"]
+    heads = set(ScriptDirectory.from_config(Config(str(ALEMBIC_INI))).get_heads())
+    if current != heads:
+        return [
+            f"schéma en révision {sorted(current) or 'aucune'}, attendu {sorted(heads)} : "
+            "lancer `alembic upgrade head`"
+        ]
+    return []
+
+
+async def run_startup_checks() -> None:
+    """
+    Vérifications du hook lifespan, bornées par STARTUP_CHECK_TIMEOUT_SECONDS.
+    Une base lente ou en retard de migration ne bloque pas le démarrage, sauf
+    si STARTUP_CHECK_STRICT est activé.
+    """
+    try:
+        problemes = await asyncio.wait_for(
+            run_in_threadpool(_check_database), timeout=STARTUP_CHECK_TIMEOUT_SECONDS
+        )
+    except asyncio.TimeoutError:
+        problemes = [f"base injoignable en {STARTUP_CHECK_TIMEOUT_SECONDS:g} s"]
+    except Exception as e:
+        problemes = [f"base injoignable : {e}"]
+    for probleme in problemes:
+        logger.warning("Vérification au démarrage : %s", probleme)
+    if problemes and STARTUP_CHECK_STRICT:
+        raise RuntimeError("Vérifications au démarrage en échec : " + " ; ".join(problemes))
@@ -4,7 +4,7 @@ from sqlalchemy.orm import Session
 from app.core.database import get_db
 from app.core.security import decode_access_token
 from app.services import user_service
-from app.models.user import User
+from app.models.user import CurrentUser, User
 
 # Définit le schéma OAuth2 pour l'authentification par Bearer Token
 # Le tokenUrl pointe vers l'endpoint de connexion que nous venons de créer
@@ -14,10 +14,13 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
 def get_current_user(
     db: Session = Depends(get_db), 
     token: str = Depends(oauth2_scheme)
-) -> User:
+) -> CurrentUser:
     """
     Dépendance FastAPI pour valider le token JWT et récupérer l'utilisateur.
     Utilisée pour sécuriser les endpoints en exigeant un token valide.
+    L'identité (id, email, rôle, actif) est servie par user_cache, invalidé par
+    user_service à chaque modification : pas de SELECT sur les requêtes suivantes.
+    Un jeton d'une génération antérieure (token_version) est refusé.
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -35,11 +38,16 @@ def get_current_user(
     if email is None:
         raise credentials_exception
     
-    # 3. Récupérer l'utilisateur dans la base de données
-    user = user_service.get_user_by_email(db, email=email)
-    if user is None:
+    # 3. Récupérer l'utilisateur (cache, sinon base de données)
+    user = user_service.get_current_identity(db, email=email)
+    if user is None or not user_service.token_is_current(payload, user):
         raise credentials_exception
-        
+
+    if not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Compte désactivé."
+        )
     return user
 
 # Dépendance pour s'assurer que l'utilisateur est un Admin
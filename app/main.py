@@ -1,13 +1,24 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import Depends, FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from app.core.database import engine, Base 
+from app.core.database import (
+    dispose_async_engine, pool_status, replica_engine, READ_PRIMARY_COOKIE, read_primary_until,
+)
+from app.core.cache import CACHES
+from app.core.config import DB_REPLICA_STICKY_SECONDS, METRICS_ENABLED
+from app.core import hashing, metrics
+from app.core.instrumentation import RequestTimingMiddleware, TimedRoute
+from app.core.startup import run_startup_checks
+from app.dependencies import get_current_admin
+from app.services import pdf_service
 
 # --- IMPORTS DIRECTS DES MODÈLES ---
-# Ces imports permettent à SQLAlchemy de détecter vos tables automatiquement.
-# On importe chaque classe pour éviter les problèmes de dossiers vides (__init__.py).
+# Le schéma est géré par Alembic (`alembic upgrade head`), jamais à l'import.
+# Ces imports complètent le registre SQLAlchemy avant la configuration des relations.
 from app.models.user import User, RefreshToken
 from app.models.crm import Client, Projet
-from app.models.devis import Devis, LotDevis, LignePoste, Facture
+from app.models.devis import Devis, LotDevis, LignePoste, Facture, CompteurNumerotation
 from app.models.chantier import JalonChantier, JournalEntry, PointageHeures
 # -----------------------------------
 
@@ -17,16 +28,26 @@ from app.routers import auth as auth_router
 from app.routers import devis as devis_router 
 from app.routers import chantier as chantier_router 
 
-def create_db_tables():
-    """Crée toutes les tables dans PostgreSQL au démarrage si elles n'existent pas."""
-    Base.metadata.create_all(bind=engine)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Démarrage : vérifications bornées dans le temps. Arrêt : pools et connexions."""
+    await run_startup_checks()
+    yield
+    pdf_service.shutdown_pool()
+    hashing.shutdown_pool()
+    await dispose_async_engine()
+    metrics.mark_process_dead()
+
 
 # Initialisation de FastAPI
 app = FastAPI(
     title="API BTP - Management",
     description="Solution de gestion complète : CRM, Devis et Suivi de chantier.",
     version="1.0.0",
+    lifespan=lifespan,
 )
+app.router.route_class = TimedRoute  # routes déclarées directement sur l'application
 
 # Configuration CORS pour permettre les requêtes depuis le frontend
 app.add_middleware(
@@ -35,10 +56,31 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Server-Timing"],
 )
 
-# Lancement de la création des tables
-create_db_tables()
+
+@app.middleware("http")
+async def read_your_writes(request: Request, call_next):
+    """Après une écriture réussie, les lectures du client restent un instant sur le primaire."""
+    response = await call_next(request)
+    if (
+        replica_engine is not None
+        and request.method not in ("GET", "HEAD", "OPTIONS")
+        and response.status_code < 400
+    ):
+        response.set_cookie(
+            READ_PRIMARY_COOKIE, str(read_primary_until()),
+            max_age=int(DB_REPLICA_STICKY_SECONDS) + 1, httponly=True, samesite="lax",
+        )
+    return response
+
+
+if METRICS_ENABLED:
+    # À l'intérieur de RequestTimingMiddleware, dont il lit le gabarit de route
+    app.add_middleware(metrics.MetricsMiddleware)
+# Ajouté en dernier, donc le plus externe : le temps total couvre les autres middlewares
+app.add_middleware(RequestTimingMiddleware)
 
 # Enregistrement des routes pour chaque module
 app.include_router(crm_router.router)
@@ -50,4 +92,24 @@ app.include_router(chantier_router.router)
 @app.get("/")
 def read_root():
     """Vérification que l'API est bien en ligne."""
-    return {"message": "API BTP V1 opérationnelle !"}
\ No newline at end of file
+    return {"message": "API BTP V1 opérationnelle !"}
+
+
+@app.get("/stats/caches", dependencies=[Depends(get_current_admin)])
+def read_cache_stats():
+    """Compteurs succès/échecs des caches applicatifs (par worker)."""
+    return [cache.stats() for cache in CACHES.values()]
+
+
+@app.get("/stats/db-pool", dependencies=[Depends(get_current_admin)])
+def read_db_pool_stats():
+    """État du pool de connexions SQL (par worker) : connexions prises, débordement, attente."""
+    return pool_status()
+
+
+if METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    def read_metrics():
+        """Métriques Prometheus (format texte), agrégées sur tous les workers."""
+        body, content_type = metrics.render()
+        return Response(content=body, media_type=content_type)
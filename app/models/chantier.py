@@ -1,6 +1,6 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Boolean, func, Date, Float
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Boolean, Date, Float, Index
 from sqlalchemy.orm import relationship
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from typing import Optional, List
 from datetime import date, datetime
 
@@ -13,7 +13,7 @@ class JalonChantier(Base):
     __tablename__ = "jalons_chantier"
     
     id = Column(Integer, primary_key=True, index=True)
-    projet_id = Column(Integer, ForeignKey("projets.id"))
+    projet_id = Column(Integer, ForeignKey("projets.id"), index=True)
     
     nom = Column(String) # Nom de l'étape (ex: Fondations, Pose menuiseries)
     date_prevue = Column(Date) # Date cible
@@ -28,14 +28,24 @@ class JournalEntry(Base):
     projet_id = Column(Integer, ForeignKey("projets.id"))
     user_id = Column(Integer, ForeignKey("users.id")) # Auteur de la note
     
-    date_entry = Column(DateTime, default=func.now())
+    date_entry = Column(DateTime, default=datetime.utcnow)
     type_entry = Column(String, default="Note") # Note, Incident, Photo, Météo
     description = Column(String)
     file_url = Column(String, nullable=True) # Lien vers une photo stockée
 
+    __table_args__ = (
+        # Journal d'un projet, entrées les plus récentes d'abord (get_journal_by_projet) ;
+        # déclaré après les colonnes pour l'ordre descendant sur date_entry
+        Index("ix_journal_chantier_projet_id_date_entry", projet_id, date_entry.desc()),
+    )
+
 class PointageHeures(Base):
     """Modèle pour le suivi du temps de travail (Pointage)."""
     __tablename__ = "pointage_heures"
+    __table_args__ = (
+        # Pointages d'un utilisateur sur une période (get_pointages_by_user)
+        Index("ix_pointage_heures_user_id_date_travail", "user_id", "date_travail"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     projet_id = Column(Integer, ForeignKey("projets.id"))
@@ -64,8 +74,7 @@ class JalonResponse(JalonBase):
     date_realisation: Optional[date] = None
     termine: bool
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 # Journal de Bord
 class JournalEntryBase(BaseModel):
@@ -82,8 +91,7 @@ class JournalEntryResponse(JournalEntryBase):
     user_id: int
     date_entry: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 # Pointage des Heures
 class PointageBase(BaseModel):
@@ -101,5 +109,4 @@ class PointageResponse(PointageBase):
     user_id: int
     duree_heures: float
     
-    class Config:
-        from_attributes = True
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
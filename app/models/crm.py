@@ -1,10 +1,10 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, func
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
 from sqlalchemy.orm import relationship
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from typing import Optional
 from datetime import datetime
 
-from app.core.database import Base 
+from app.core.database import Base, version_column
 
 # --- Modèles de Base de Données (SQLAlchemy ORM) ---
 
@@ -18,7 +18,8 @@ class Client(Base):
     telephone = Column(String, nullable=True)
     email = Column(String, unique=True, index=True)
     adresse = Column(String, nullable=True)
-    date_creation = Column(DateTime, default=func.now())
+    date_creation = Column(DateTime, default=datetime.utcnow)
+    version = version_column()
     
     projets = relationship("Projet", back_populates="client") 
 
@@ -29,7 +30,8 @@ class Projet(Base):
     nom = Column(String, index=True)
     description = Column(String, nullable=True)
     statut = Column(String, default="Brouillon Devis") 
-    date_creation = Column(DateTime, default=func.now())
+    date_creation = Column(DateTime, default=datetime.utcnow)
+    version = version_column()
     
     client_id = Column(Integer, ForeignKey("clients.id"))
     client = relationship("Client", back_populates="projets")
@@ -65,8 +67,7 @@ class ClientResponse(BaseModel):
     adresse: Optional[str] = None
     date_creation: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 class ProjetCreate(BaseModel):
     nom: str
@@ -87,5 +88,4 @@ class ProjetResponse(BaseModel):
     client_id: int
     date_creation: datetime
 
-    class Config:
-        from_attributes = True
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
@@ -1,28 +1,35 @@
 from typing import List, Optional
-from datetime import datetime
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, func
+from datetime import date, datetime
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
-from pydantic import BaseModel
-from app.core.database import Base
+from pydantic import BaseModel, ConfigDict
+from app.core.database import Base, version_column
 
 # --- MODÈLES SQLALCHEMY (Base de données) ---
 
 
 class Devis(Base):
     __tablename__ = "devis"
+    __table_args__ = (
+        # Liste paginée (tri date_emission, id), avec ou sans filtre sur le statut
+        Index("ix_devis_statut_date_emission", "statut", "date_emission", "id"),
+        Index("ix_devis_date_emission_id", "date_emission", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    projet_id = Column(Integer, ForeignKey("projets.id"))
+    projet_id = Column(Integer, ForeignKey("projets.id"), index=True)
     client_id = Column(Integer, ForeignKey("clients.id"))
     user_id = Column(Integer, ForeignKey("users.id"))
 
     nom = Column(String, index=True)
     statut = Column(String, default="Brouillon", nullable=False)
-    date_emission = Column(DateTime, default=func.now())
+    date_emission = Column(DateTime, default=datetime.utcnow)
     taux_tva = Column(Float, default=20.0)
     total_ht = Column(Float, default=0.0)
     total_ttc = Column(Float, default=0.0)
     validite_jours = Column(Integer, default=30)
+    # Incrémentée aussi à chaque modification de ses lots et lignes (ETag du devis complet)
+    version = version_column()
 
     lots = relationship(
         "LotDevis", back_populates="devis", cascade="all, delete-orphan"
@@ -35,7 +42,7 @@ class LotDevis(Base):
     __tablename__ = "lots_devis"
 
     id = Column(Integer, primary_key=True, index=True)
-    devis_id = Column(Integer, ForeignKey("devis.id"))
+    devis_id = Column(Integer, ForeignKey("devis.id"), index=True)
     nom = Column(String)
     ordre = Column(Integer)
     total_lot_ht = Column(Float, default=0.0)
@@ -50,7 +57,7 @@ class LignePoste(Base):
     __tablename__ = "lignes_poste"
 
     id = Column(Integer, primary_key=True, index=True)
-    lot_id = Column(Integer, ForeignKey("lots_devis.id"))
+    lot_id = Column(Integer, ForeignKey("lots_devis.id"), index=True)
     designation = Column(String)
     unite = Column(String)
     quantite = Column(Float)
@@ -62,6 +69,10 @@ class LignePoste(Base):
 
 class Facture(Base):
     __tablename__ = "factures"
+    __table_args__ = (
+        # Factures d'un devis, et contrôle « facture validée existante » de create_facture
+        Index("ix_factures_devis_id_statut", "devis_id", "statut"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     devis_id = Column(Integer, ForeignKey("devis.id"))
@@ -70,15 +81,26 @@ class Facture(Base):
     )  # Numéro séquentiel, inaltérable
     total_ht = Column(Float)
     total_ttc = Column(Float)
-    date_emission = Column(DateTime, default=func.now())
+    date_emission = Column(DateTime, default=datetime.utcnow)
     date_prestation = Column(DateTime, nullable=True)  # Date de la vente/prestation
     mention_franchise_tva = Column(
         String, nullable=True
     )  # Mention légale si franchise TVA
+    statut = Column(String, default="Brouillon", nullable=False)  # Brouillon, Validée, Avoir
+    version = version_column()
 
     devis = relationship("Devis", back_populates="factures")
 
 
+class CompteurNumerotation(Base):
+    """Compteur d'une série de numérotation légale (une ligne par série : FAC, AVOIR...)."""
+
+    __tablename__ = "compteurs_numerotation"
+
+    serie = Column(String, primary_key=True)
+    dernier_numero = Column(Integer, nullable=False, default=0)
+
+
 # --- SCHÉMAS PYDANTIC (Validation API) ---
 
 
@@ -97,8 +119,7 @@ class LignePosteResponse(LignePosteBase):
     id: int
     total_ligne_ht: float
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class LotDevisBase(BaseModel):
@@ -115,8 +136,7 @@ class LotDevisResponse(LotDevisBase):
     total_lot_ht: float
     lignes_poste: List[LignePosteResponse]
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class DevisBase(BaseModel):
@@ -142,8 +162,7 @@ class DevisResponse(DevisBase):
     lots: List[LotDevisResponse]
     signature_path: Optional[str] = None
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class DevisUpdate(BaseModel):
@@ -155,6 +174,59 @@ class DevisUpdate(BaseModel):
     validite_jours: Optional[int] = None
 
 
+class LotDevisUpdate(BaseModel):
+    """Schéma pour la mise à jour d'un lot (les totaux ne sont pas modifiables)."""
+
+    nom: Optional[str] = None
+    ordre: Optional[int] = None
+
+
+class LignePosteUpdate(BaseModel):
+    """Schéma pour la mise à jour partielle d'une ligne de poste."""
+
+    designation: Optional[str] = None
+    unite: Optional[str] = None
+    quantite: Optional[float] = None
+    prix_unitaire_ht: Optional[float] = None
+
+
+class LotEditResponse(BaseModel):
+    """Lot créé ou modifié, avec les nouveaux totaux du devis."""
+
+    lot: LotDevisResponse
+    total_ht: float
+    total_ttc: float
+
+
+class LigneEditResponse(BaseModel):
+    """Ligne créée ou modifiée, avec les nouveaux totaux du lot et du devis."""
+
+    ligne: LignePosteResponse
+    total_lot_ht: float
+    total_ht: float
+    total_ttc: float
+
+
+class RecalculDevisRequest(BaseModel):
+    """Filtre du recalcul en masse des totaux (tous les critères sont optionnels)."""
+
+    statut: Optional[str] = None
+    projet_id: Optional[int] = None
+    date_debut: Optional[date] = None  # date d'émission, incluse
+    date_fin: Optional[date] = None  # date d'émission, incluse
+    dry_run: bool = False  # compte les écarts sans rien enregistrer
+
+
+class RecalculDevisResponse(BaseModel):
+    """Bilan du recalcul : nombre de lignes réellement modifiées à chaque niveau."""
+
+    devis_examines: int
+    lignes_modifiees: int
+    lots_modifies: int
+    devis_modifies: int
+    dry_run: bool
+
+
 # --- SCHÉMAS PYDANTIC (Factures) ---
 
 
@@ -164,17 +236,23 @@ class FactureCreate(BaseModel):
     devis_id: int
 
 
+class FactureBulkCreate(BaseModel):
+    """Schéma pour facturer plusieurs devis d'un coup (numéros réservés en bloc)."""
+
+    devis_ids: List[int]
+
+
 class FactureResponse(BaseModel):
     """Schéma de réponse pour une facture."""
 
     id: int
     devis_id: int
     numero_facture: str
+    statut: str
     total_ht: float
     total_ttc: float
     date_emission: datetime
     date_prestation: datetime | None = None
     mention_franchise_tva: str | None = None
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
@@ -1,8 +1,8 @@
 from typing import Optional
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, func
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey
 from sqlalchemy.orm import relationship
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, ConfigDict, EmailStr
 from app.core.database import Base
 
 
@@ -18,10 +18,9 @@ class User(Base):
     is_active = Column(Boolean, default=True)
     full_name = Column(String, nullable=True)
     role = Column(String, default="artisan")  # 'admin', 'artisan', 'gestionnaire'
-    date_creation = Column(DateTime, default=func.now())
-
-    # Relation favoris (prestations type)
-    favoris = relationship("Favori", back_populates="user")
+    date_creation = Column(DateTime, default=datetime.utcnow)
+    # Génération des jetons : l'incrémenter invalide tous les jetons émis (claim "tv")
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
 
 
 # --- SCHÉMAS PYDANTIC (Validation API) ---
@@ -46,8 +45,7 @@ class UserResponse(BaseModel):
     is_active: bool
     date_creation: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class UserUpdate(BaseModel):
@@ -60,6 +58,18 @@ class UserUpdate(BaseModel):
     password: Optional[str] = None
 
 
+class CurrentUser(BaseModel):
+    """Identité résolue par get_current_user (mise en cache, sans accès à la base)."""
+
+    model_config = ConfigDict(frozen=True, from_attributes=True)
+
+    id: int
+    email: str
+    role: str
+    is_active: bool
+    token_version: int = 0
+
+
 class Token(BaseModel):
     """Schéma pour le jeton JWT."""
 
@@ -72,8 +82,7 @@ class RefreshTokenResponse(BaseModel):
     token: str
     expires_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # --- Modèle de stockage des refresh tokens ---
@@ -81,10 +90,11 @@ class RefreshToken(Base):
     __tablename__ = "refresh_tokens"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
-    token = Column(String, unique=True, index=True)
-    expires_at = Column(DateTime)
-    revoked = Column(Boolean, default=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # SHA-256 du jeton : le jeton lui-même n'est jamais stocké
+    token_hash = Column(String(64), unique=True, index=True, nullable=False)
+    expires_at = Column(DateTime, index=True)  # index utilisé par la compaction
+    revoked = Column(Boolean, default=False, nullable=False)
 
 
 class TokenData(BaseModel):
@@ -1,14 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Body, Response, Cookie
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from app.core.database import get_db
+from app.core.instrumentation import TimedRoute
+from app.core.pagination import set_next_cursor
 from app.models.user import User, UserCreate, UserUpdate, UserResponse, Token
 from app.services import user_service
-from app.dependencies import get_current_user
+from app.dependencies import get_current_admin, get_current_user
 
 # Cette variable 'router' est celle que main.py importe
-router = APIRouter(prefix="/auth", tags=["Authentification"])
+router = APIRouter(prefix="/auth", tags=["Authentification"], route_class=TimedRoute)
 
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 def register_user(user_data: UserCreate, db: Session = Depends(get_db)):
@@ -24,15 +27,16 @@ def register_user(user_data: UserCreate, db: Session = Depends(get_db)):
     return user_service.create_user(db, user=user_data)
 
 @router.post("/token", response_model=Token)
-def login_for_access_token(
+async def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db),
     response: Response = None
 ):
     """
     Vérifie les identifiants et génère un jeton d'accès JWT.
+    bcrypt tourne dans un pool de processus borné : 503 immédiat s'il est saturé.
     """
-    user = user_service.authenticate_user(
+    user = await user_service.authenticate_user(
         db,
         email=form_data.username,
         password=form_data.password
@@ -45,6 +49,11 @@ def login_for_access_token(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    return await run_in_threadpool(_issue_tokens, db, user, response)
+
+
+def _issue_tokens(db: Session, user: User, response: Optional[Response]) -> dict:
+    """Émet les jetons (accès + refresh en cookie) d'un utilisateur authentifié."""
     tokens = user_service.create_user_tokens(user)
     # Enregistrer le refresh token en base
     from app.core.security import decode_access_token
@@ -104,26 +113,23 @@ def refresh_access_token(db: Session = Depends(get_db), refresh_token: str | Non
     if not email:
         raise HTTPException(status_code=401, detail='Refresh token invalide')
 
-    # Vérifier en base que le refresh token est connu et non révoqué
-    db_rec = user_service.get_refresh_record(db, refresh_token)
-    if not db_rec or db_rec.revoked:
+    # Utilisateur actif et jeton de la génération courante (cf. revoke-tokens)
+    user = user_service.get_current_identity(db, email=email)
+    if not user or not user.is_active or not user_service.token_is_current(token_payload, user):
         raise HTTPException(status_code=401, detail='Refresh token invalide ou révoqué')
 
-    # Rotation : générer un nouveau refresh token et révoquer l'ancien
-    from app.core.security import create_refresh_token
-    new_refresh = create_refresh_token({"sub": email})
+    # Rotation : générer un nouveau refresh token, puis révoquer l'ancien et enregistrer
+    # le nouveau dans une seule transaction (échoue si l'ancien est inconnu ou révoqué)
+    tokens = user_service.create_user_tokens(user)
+    new_refresh = tokens["refresh_token"]
     from datetime import datetime
     new_payload = decode_access_token(new_refresh)
     expires_at = datetime.utcfromtimestamp(new_payload.get('exp')) if new_payload and new_payload.get('exp') else None
-    # enregistrer le nouveau et révoquer l'ancien
-    user_id = db_rec.user_id
-    try:
-        user_service.rotate_refresh_token(db, old_token=refresh_token, new_token=new_refresh, new_expires_at=expires_at, user_id=user_id)
-    except Exception:
-        pass
+    user_id = user_service.rotate_refresh_token(db, old_token=refresh_token, new_token=new_refresh, new_expires_at=expires_at)
+    if user_id is None:
+        raise HTTPException(status_code=401, detail='Refresh token invalide ou révoqué')
 
-    # Générer un nouvel access token
-    new_access = user_service.create_user_access_token_from_email(email)
+    new_access = tokens["access_token"]
     # Set the new refresh token in cookie (rotation)
     if response:
         max_age = None
@@ -139,19 +145,29 @@ def refresh_access_token(db: Session = Depends(get_db), refresh_token: str | Non
 
 @router.get("/users/", response_model=List[UserResponse])
 def list_users(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     role: Optional[str] = None,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Liste tous les utilisateurs (pagination + filtre par rôle)."""
-    return user_service.get_all_users(db, skip=skip, limit=limit, role=role)
+    """Liste tous les utilisateurs (pagination par curseur ou skip/limit + filtre par rôle)."""
+    users = user_service.get_all_users(db, skip=skip, limit=limit, role=role, cursor=cursor)
+    set_next_cursor(response, users, limit, "date_creation")
+    return users
 
 @router.get("/users/me", response_model=UserResponse)
-def get_current_user_info(current_user: User = Depends(get_current_user)):
-    """Récupère les informations de l'utilisateur connecté."""
-    return current_user
+def get_current_user_info(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Récupère les informations de l'utilisateur connecté (profil complet, lu en base)."""
+    user = user_service.get_user_by_id(db, user_id=current_user.id)
+    if not user:
+        raise HTTPException(status_code=404, detail="Utilisateur non trouvé")
+    return user
 
 @router.get("/users/{user_id}", response_model=UserResponse)
 def get_user(
@@ -202,4 +218,17 @@ def toggle_user_status(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Vous ne pouvez pas désactiver votre propre compte."
         )
-    return user_service.toggle_user_active(db, user_id=user_id)
\ No newline at end of file
+    return user_service.toggle_user_active(db, user_id=user_id)
+
+@router.post("/users/{user_id}/revoke-tokens")
+def revoke_user_tokens(
+    user_id: int,
+    db: Session = Depends(get_db),
+    current_admin: User = Depends(get_current_admin)
+):
+    """
+    Déconnecte un utilisateur de toutes ses sessions (admin) : tous ses jetons
+    d'accès et de rafraîchissement deviennent invalides, en une seule écriture.
+    """
+    token_version = user_service.revoke_all_tokens(db, user_id=user_id)
+    return {"user_id": user_id, "token_version": token_version}
@@ -3,7 +3,8 @@ from sqlalchemy.orm import Session
 from typing import List
 from datetime import date
 
-from app.core.database import get_db
+from app.core.database import get_db, get_read_db
+from app.core.instrumentation import TimedRoute
 from app.dependencies import get_current_user
 from app.models.user import User
 from app.models.chantier import (
@@ -14,7 +15,7 @@ from app.models.chantier import (
 from app.services import chantier_service
 
 # Définit le routeur pour le module de suivi de chantier
-router = APIRouter(prefix="/chantier", tags=["Suivi de Chantier"])
+router = APIRouter(prefix="/chantier", tags=["Suivi de Chantier"], route_class=TimedRoute)
 
 # --- 1. ENDPOINTS POUR LES JALONS (PLANNING) ---
 
@@ -39,7 +40,7 @@ def complete_jalon(
 @router.get("/jalons/{projet_id}", response_model=List[JalonResponse])
 def get_jalons_projet(
     projet_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """Récupère tous les jalons d'un projet."""
@@ -71,7 +72,7 @@ def add_journal_entry(
 def get_journal_projet(
     projet_id: int,
     limit: int = 50,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """Récupère le journal d'un projet."""
@@ -93,7 +94,7 @@ def clock_in_out(
 def get_my_pointages(
     start_date: date, 
     end_date: date, 
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """Récupère mes heures pointées sur une période donnée."""
@@ -1,14 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Response
 from sqlalchemy.orm import Session
-from typing import List
-from app.core.database import get_db
+from typing import List, Optional
+from app.core.database import get_db, get_read_db
+from app.core.instrumentation import TimedRoute
+from app.core.etag import check_etag, make_etag, make_list_etag
+from app.core.pagination import set_next_cursor
 from app.models.crm import ClientCreate, ClientUpdate, ClientResponse, ProjetCreate, ProjetUpdate, ProjetResponse
 from app.services import crm_service
 from app.dependencies import get_current_user
 from app.models.user import User
 
 # Définit le routeur pour le module CRM
-router = APIRouter(prefix="/crm", tags=["CRM Management"])
+router = APIRouter(prefix="/crm", tags=["CRM Management"], route_class=TimedRoute)
 
 # --- ENDPOINTS CLIENTS ---
 
@@ -29,21 +32,43 @@ def handle_create_client(
 
 @router.get("/clients/", response_model=List[ClientResponse])
 def handle_list_clients(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Liste tous les clients avec pagination."""
-    return crm_service.get_all_clients(db, skip=skip, limit=limit)
+    """
+    Liste tous les clients avec pagination (curseur ou skip/limit).
+    ETag calculé sur les versions de la page : 304 si la page n'a pas changé.
+    """
+    versions = crm_service.get_clients_versions(db, skip=skip, limit=limit, cursor=cursor)
+    set_next_cursor(response, versions, limit, "date_creation")
+    not_modified = check_etag(request, response, make_list_etag("clients", versions))
+    if not_modified:
+        return not_modified
+    return crm_service.get_all_clients(db, skip=skip, limit=limit, cursor=cursor)
 
 @router.get("/clients/{client_id}", response_model=ClientResponse)
 def handle_read_client(
     client_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Récupère un client par son ID."""
+    """Récupère un client par son ID (304 si l'ETag envoyé est toujours valide)."""
+    version = crm_service.get_client_version(db, client_id)
+    if version is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Client non trouvé"
+        )
+    not_modified = check_etag(request, response, make_etag("client", client_id, version))
+    if not_modified:
+        return not_modified
     db_client = crm_service.get_client(db, client_id=client_id)
     if db_client is None:
         raise HTTPException(
@@ -90,21 +115,43 @@ def handle_create_projet(
 
 @router.get("/projets/", response_model=List[ProjetResponse])
 def handle_list_projets(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Liste tous les projets avec pagination."""
-    return crm_service.get_projets(db, skip=skip, limit=limit)
+    """
+    Liste tous les projets avec pagination (curseur ou skip/limit).
+    ETag calculé sur les versions de la page : 304 si la page n'a pas changé.
+    """
+    versions = crm_service.get_projets_versions(db, skip=skip, limit=limit, cursor=cursor)
+    set_next_cursor(response, versions, limit, "date_creation")
+    not_modified = check_etag(request, response, make_list_etag("projets", versions))
+    if not_modified:
+        return not_modified
+    return crm_service.get_projets(db, skip=skip, limit=limit, cursor=cursor)
 
 @router.get("/projets/{projet_id}", response_model=ProjetResponse)
 def handle_read_projet(
     projet_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Récupère un projet par son ID."""
+    """Récupère un projet par son ID (304 si l'ETag envoyé est toujours valide)."""
+    version = crm_service.get_projet_version(db, projet_id)
+    if version is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Projet non trouvé"
+        )
+    not_modified = check_etag(request, response, make_etag("projet", projet_id, version))
+    if not_modified:
+        return not_modified
     db_projet = crm_service.get_projet(db, projet_id=projet_id)
     if db_projet is None:
         raise HTTPException(
@@ -1,20 +1,42 @@
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Body
+import logging
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Body, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.core.database import get_db
-from app.dependencies import get_current_user
+from app.core.cache import devis_cache
+from app.core.database import (
+    SessionLocal, get_async_db, get_db, get_read_db, is_replica_session, read_sessionmaker,
+)
+from app.core.etag import check_etag, make_etag, make_list_etag
+from app.core.instrumentation import TimedRoute
+from app.core.pagination import set_next_cursor
+from app.core.serialization import dump_json, json_response
+from app.dependencies import get_current_admin, get_current_user
 from app.models.user import User
 from app.models.devis import (
     DevisCreate,
     DevisUpdate,
     DevisResponse,
+    RecalculDevisRequest,
+    RecalculDevisResponse,
+    LotDevisCreate,
+    LotDevisUpdate,
+    LotEditResponse,
+    LignePosteCreate,
+    LignePosteUpdate,
+    LigneEditResponse,
     FactureCreate,
+    FactureBulkCreate,
     FactureResponse,
 )
-from app.services import devis_service, ai_service
+from app.services import devis_service, ai_service, pdf_service
+
+logger = logging.getLogger(__name__)
 
 # Cette variable 'router' est indispensable pour que main.py puisse l'importer
-router = APIRouter(prefix="/devis", tags=["Devis & Facturation"])
+router = APIRouter(prefix="/devis", tags=["Devis & Facturation"], route_class=TimedRoute)
 
 
 # --- 1. CRÉATION MANUELLE ---
@@ -26,15 +48,44 @@ def handle_create_devis(
 ):
     """Crée un devis complet avec calculs automatiques."""
     try:
-        return devis_service.create_full_devis(
+        devis = devis_service.create_full_devis(
             db, devis_data=devis_data, user_id=current_user.id
         )
     except Exception as e:
-        print(f"Erreur création devis : {e}")
+        logger.exception("Erreur création devis")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Erreur lors de la création du devis.",
         ) from e
+    return json_response(
+        dump_json(DevisResponse, devis), status_code=status.HTTP_201_CREATED
+    )
+
+
+@router.post(
+    "/bulk", response_model=List[DevisResponse], status_code=status.HTTP_201_CREATED
+)
+def handle_create_devis_bulk(
+    devis_list: List[DevisCreate],
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Crée plusieurs devis complets en une seule transaction (tout ou rien)."""
+    try:
+        devis = devis_service.create_bulk_devis(
+            db, devis_list=devis_list, user_id=current_user.id
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Erreur création groupée de devis")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Erreur lors de la création groupée des devis.",
+        ) from e
+    return json_response(
+        dump_json(DevisResponse, devis, many=True), status_code=status.HTTP_201_CREATED
+    )
 
 
 # --- 2. GÉNÉRATION PAR IA ---
@@ -44,10 +95,13 @@ def handle_create_devis(
 async def handle_generate_ai_devis(
     prompt: str = Body(..., embed=True),
     projet_id: int = Body(..., embed=True),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
-    """Analyse une description via l'IA et génère le devis."""
+    """
+    Analyse une description via l'IA et génère le devis.
+    Route asynchrone : l'écriture passe par la session asynchrone (aucune I/O bloquante sur la boucle).
+    """
     try:
         # Appel au service IA pour transformer le texte en JSON
         ai_generated_data = await ai_service.generate_devis_from_prompt(prompt)
@@ -55,11 +109,11 @@ async def handle_generate_ai_devis(
 
         # Validation et enregistrement via le service de devis
         devis_data = DevisCreate(**ai_generated_data)
-        return devis_service.create_full_devis(
+        return await devis_service.create_full_devis_async(
             db, devis_data=devis_data, user_id=current_user.id
         )
     except Exception as e:
-        print(f"Erreur génération IA : {e}")
+        logger.exception("Erreur génération IA")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Échec de la génération automatique via l'IA.",
@@ -69,27 +123,142 @@ async def handle_generate_ai_devis(
 # --- 3. LECTURE ---
 @router.get("/", response_model=List[DevisResponse])
 def handle_list_devis(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     statut: Optional[str] = None,
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
 ):
-    """Liste tous les devis avec pagination et filtre optionnel sur le statut."""
-    return devis_service.get_all_devis(db, skip=skip, limit=limit, statut=statut)
+    """
+    Liste tous les devis avec pagination et filtre optionnel sur le statut.
+    La page suivante s'obtient en repassant l'en-tête X-Next-Cursor dans `cursor`.
+    ETag calculé sur les versions de la page : 304 si la page n'a pas changé.
+    """
+    versions = devis_service.get_devis_versions(
+        db, skip=skip, limit=limit, statut=statut, cursor=cursor
+    )
+    set_next_cursor(response, versions, limit, "date_emission")
+    not_modified = check_etag(request, response, make_list_etag("devis", versions))
+    if not_modified:
+        return not_modified
+    devis = devis_service.get_all_devis(
+        db, skip=skip, limit=limit, statut=statut, cursor=cursor
+    )
+    return json_response(dump_json(DevisResponse, devis, many=True), response)
+
+
+@router.get("/export")
+def handle_export_devis(
+    request: Request,
+    export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+    statut: Optional[str] = None,
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Exporte tout l'historique des devis (lots et lignes compris) en flux continu.
+    NDJSON : un devis par ligne ; CSV : une ligne par ligne de poste.
+    """
+
+    session_factory = read_sessionmaker(request)
+
+    def stream():
+        # Session propre au flux : elle doit vivre jusqu'au dernier octet envoyé.
+        db = session_factory()
+        try:
+            yield from devis_service.iter_devis_export(
+                db, export_format=export_format, statut=statut
+            )
+        finally:
+            db.close()
+
+    media_type = "text/csv" if export_format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        stream(),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="devis.{export_format}"'
+        },
+    )
+
+
+def _pack_cached(version: int, body: bytes) -> bytes:
+    """Entrée de devis_cache : version du devis, saut de ligne, puis le JSON."""
+    return b"%d\n%s" % (version, body)
+
+
+def _unpack_cached(value: bytes) -> Optional[tuple[int, bytes]]:
+    """(version, JSON) ; None pour une entrée d'un ancien format (traitée comme absente)."""
+    version, _, body = value.partition(b"\n")
+    if not version.isdigit():
+        return None
+    return int(version), body
 
 
 @router.get("/{devis_id}", response_model=DevisResponse)
 def handle_get_devis(
     devis_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
 ):
-    """Récupère un devis par son ID."""
-    devis = devis_service.get_devis_by_id(db, devis_id)
-    if not devis:
+    """
+    Récupère un devis par son ID. La réponse sérialisée est servie depuis le cache
+    (devis_cache), invalidé par toute écriture sur le devis, ses lots ou ses lignes.
+    L'ETag dérive de la version du devis : 304 sans chargement si elle n'a pas changé.
+    Le corps et son ETag viennent toujours de la même lecture (version stockée avec
+    le corps en cache), même quand la réplique est en retard sur le primaire.
+    """
+    version = devis_service.get_devis_version(db, devis_id)
+    if version is None:
         raise HTTPException(status_code=404, detail="Devis non trouvé")
-    return devis
+    not_modified = check_etag(request, response, make_etag("devis", devis_id, version))
+    if not_modified:
+        return not_modified
+
+    cached = devis_cache.get(devis_id)
+    entry = _unpack_cached(cached) if cached is not None else None
+    if entry is None:
+        generation = devis_cache.generation()
+        # Le cache est partagé : il se remplit depuis le primaire, jamais depuis une
+        # réplique en retard qui y figerait un état antérieur à la dernière écriture.
+        source = SessionLocal() if is_replica_session(db) else db
+        try:
+            devis = devis_service.get_devis_by_id(source, devis_id)
+            if not devis:
+                raise HTTPException(status_code=404, detail="Devis non trouvé")
+            body_version, body = devis.version, dump_json(DevisResponse, devis)
+        finally:
+            if source is not db:
+                source.close()
+        devis_cache.set(devis_id, _pack_cached(body_version, body), generation)
+    else:
+        body_version, body = entry
+
+    etag = make_etag("devis", devis_id, body_version)
+    if body_version != version:
+        # Corps plus récent que la réplique : le client l'a peut-être déjà
+        not_modified = check_etag(request, response, etag)
+        if not_modified:
+            return not_modified
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+
+@router.get("/{devis_id}/pdf", response_class=FileResponse)
+async def handle_get_devis_pdf(
+    devis_id: int,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Document PDF du devis (rendu hors du serveur, mis en cache selon son contenu)."""
+    document = await run_in_threadpool(pdf_service.devis_document, db, devis_id)
+    if not document:
+        raise HTTPException(status_code=404, detail="Devis non trouvé")
+    path = await pdf_service.get_pdf_path("devis", document)
+    return FileResponse(path, media_type="application/pdf", filename=f"devis-{devis_id}.pdf")
 
 
 # --- 4. MISE À JOUR ---
@@ -101,7 +270,21 @@ def handle_update_devis(
     current_user: User = Depends(get_current_user),
 ):
     """Met à jour un devis existant."""
-    return devis_service.update_devis(db, devis_id=devis_id, devis_data=devis_data)
+    devis = devis_service.update_devis(db, devis_id=devis_id, devis_data=devis_data)
+    return json_response(dump_json(DevisResponse, devis))
+
+
+@router.post("/recalculate", response_model=RecalculDevisResponse)
+def handle_recalculate_devis(
+    filtre: RecalculDevisRequest,
+    db: Session = Depends(get_db),
+    current_admin: User = Depends(get_current_admin),
+):
+    """
+    Recalcule en masse les totaux (lignes, lots, devis) des devis filtrés.
+    Réservé aux administrateurs ; équivalent CLI : `python -m app.cli recalculate`.
+    """
+    return devis_service.recalculate_devis_totals(db, filtre=filtre)
 
 
 # --- 5. SUPPRESSION ---
@@ -115,11 +298,103 @@ def handle_delete_devis(
     devis_service.delete_devis(db, devis_id=devis_id)
 
 
+# --- 6. ÉDITION DES LOTS ET LIGNES ---
+# Chaque modification répercute uniquement l'écart de total sur le lot et le devis.
+@router.post(
+    "/{devis_id}/lots",
+    response_model=LotEditResponse,
+    status_code=status.HTTP_201_CREATED,
+)
+def handle_add_lot(
+    devis_id: int,
+    lot_data: LotDevisCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Ajoute un lot (avec ses lignes) à un devis."""
+    return devis_service.add_lot(db, devis_id=devis_id, lot_data=lot_data)
+
+
+@router.patch("/{devis_id}/lots/{lot_id}", response_model=LotEditResponse)
+def handle_update_lot(
+    devis_id: int,
+    lot_id: int,
+    lot_data: LotDevisUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Renomme ou réordonne un lot."""
+    return devis_service.update_lot(
+        db, devis_id=devis_id, lot_id=lot_id, lot_data=lot_data
+    )
+
+
+@router.delete("/{devis_id}/lots/{lot_id}", status_code=status.HTTP_204_NO_CONTENT)
+def handle_delete_lot(
+    devis_id: int,
+    lot_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Supprime un lot et ses lignes."""
+    devis_service.delete_lot(db, devis_id=devis_id, lot_id=lot_id)
+
+
+@router.post(
+    "/{devis_id}/lots/{lot_id}/lignes",
+    response_model=LigneEditResponse,
+    status_code=status.HTTP_201_CREATED,
+)
+def handle_add_ligne(
+    devis_id: int,
+    lot_id: int,
+    ligne_data: LignePosteCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Ajoute une ligne de poste à un lot."""
+    return devis_service.add_ligne(
+        db, devis_id=devis_id, lot_id=lot_id, ligne_data=ligne_data
+    )
+
+
+@router.patch(
+    "/{devis_id}/lots/{lot_id}/lignes/{ligne_id}", response_model=LigneEditResponse
+)
+def handle_update_ligne(
+    devis_id: int,
+    lot_id: int,
+    ligne_id: int,
+    ligne_data: LignePosteUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Modifie une ligne de poste (quantité, prix, désignation, unité)."""
+    return devis_service.update_ligne(
+        db, devis_id=devis_id, lot_id=lot_id, ligne_id=ligne_id, ligne_data=ligne_data
+    )
+
+
+@router.delete(
+    "/{devis_id}/lots/{lot_id}/lignes/{ligne_id}",
+    status_code=status.HTTP_204_NO_CONTENT,
+)
+def handle_delete_ligne(
+    devis_id: int,
+    lot_id: int,
+    ligne_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Supprime une ligne de poste."""
+    devis_service.delete_ligne(db, devis_id=devis_id, lot_id=lot_id, ligne_id=ligne_id)
+
+
 # ============================================================
 # ENDPOINTS FACTURES
 # ============================================================
 
-facture_router = APIRouter(prefix="/factures", tags=["Factures"])
+facture_router = APIRouter(prefix="/factures", tags=["Factures"], route_class=TimedRoute)
 
 
 @facture_router.post(
@@ -134,35 +409,87 @@ def handle_create_facture(
     return devis_service.create_facture(db, devis_id=facture_data.devis_id)
 
 
+@facture_router.post(
+    "/bulk", response_model=List[FactureResponse], status_code=status.HTTP_201_CREATED
+)
+def handle_create_factures_bulk(
+    facture_data: FactureBulkCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Facture plusieurs devis validés en une transaction (numéros consécutifs)."""
+    return devis_service.create_factures_bulk(db, devis_ids=facture_data.devis_ids)
+
+
 @facture_router.get("/", response_model=List[FactureResponse])
 def handle_list_factures(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
 ):
-    """Liste toutes les factures avec pagination."""
-    return devis_service.get_all_factures(db, skip=skip, limit=limit)
+    """Liste toutes les factures avec pagination (curseur ou skip/limit), avec ETag."""
+    versions = devis_service.get_factures_versions(db, skip=skip, limit=limit, cursor=cursor)
+    set_next_cursor(response, versions, limit, "date_emission")
+    not_modified = check_etag(request, response, make_list_etag("factures", versions))
+    if not_modified:
+        return not_modified
+    return devis_service.get_all_factures(db, skip=skip, limit=limit, cursor=cursor)
 
 
 @facture_router.get("/{facture_id}", response_model=FactureResponse)
 def handle_get_facture(
     facture_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
 ):
-    """Récupère une facture par son ID."""
+    """Récupère une facture par son ID (304 si l'ETag envoyé est toujours valide)."""
+    version = devis_service.get_facture_version(db, facture_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Facture non trouvée")
+    not_modified = check_etag(request, response, make_etag("facture", facture_id, version))
+    if not_modified:
+        return not_modified
     facture = devis_service.get_facture_by_id(db, facture_id)
     if not facture:
         raise HTTPException(status_code=404, detail="Facture non trouvée")
     return facture
 
 
+@facture_router.get("/{facture_id}/pdf", response_class=FileResponse)
+async def handle_get_facture_pdf(
+    facture_id: int,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Document PDF de la facture (rendu hors du serveur, mis en cache selon son contenu)."""
+    document = await run_in_threadpool(pdf_service.facture_document, db, facture_id)
+    if not document:
+        raise HTTPException(status_code=404, detail="Facture non trouvée")
+    path = await pdf_service.get_pdf_path("facture", document)
+    return FileResponse(
+        path, media_type="application/pdf", filename=f"{document['numero_facture']}.pdf"
+    )
+
+
 @facture_router.get("/devis/{devis_id}", response_model=List[FactureResponse])
 def handle_get_factures_by_devis(
     devis_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
 ):
-    """Récupère toutes les factures liées à un devis."""
+    """Récupère toutes les factures liées à un devis (avec ETag)."""
+    versions = devis_service.get_factures_by_devis_versions(db, devis_id)
+    not_modified = check_etag(
+        request, response, make_list_etag(f"factures-devis-{devis_id}", versions)
+    )
+    if not_modified:
+        return not_modified
     return devis_service.get_factures_by_devis(db, devis_id=devis_id)
@@ -1,6 +1,9 @@
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from app.models.crm import Client, ClientCreate, ClientUpdate, Projet, ProjetCreate, ProjetUpdate
 from fastapi import HTTPException, status
+from typing import Optional
+from app.core.pagination import paginate
 
 # --- Logique pour les Clients ---
 
@@ -20,9 +23,18 @@ def create_client(db: Session, client: ClientCreate) -> Client:
     db.refresh(db_client)
     return db_client
 
-def get_all_clients(db: Session, skip: int = 0, limit: int = 100):
-    """Récupère la liste paginée de tous les clients."""
-    return db.query(Client).offset(skip).limit(limit).all()
+def get_all_clients(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None):
+    """Récupère la liste paginée de tous les clients (triée par date de création)."""
+    return paginate(db.query(Client), Client.date_creation, Client.id, skip=skip, limit=limit, cursor=cursor)
+
+def get_client_version(db: Session, client_id: int) -> Optional[int]:
+    """Version de ligne d'un client, None s'il n'existe pas."""
+    return db.scalar(select(Client.version).where(Client.id == client_id))
+
+def get_clients_versions(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None):
+    """(id, version, date_creation) de la même page que get_all_clients."""
+    query = db.query(Client.id, Client.version, Client.date_creation)
+    return paginate(query, Client.date_creation, Client.id, skip=skip, limit=limit, cursor=cursor)
 
 def update_client(db: Session, client_id: int, client_data: ClientUpdate) -> Client:
     """Met à jour un client existant."""
@@ -56,9 +68,9 @@ def delete_client(db: Session, client_id: int) -> bool:
 
 # --- Logique pour les Projets ---
 
-def get_projets(db: Session, skip: int = 0, limit: int = 100):
-    """Récupère la liste des projets."""
-    return db.query(Projet).offset(skip).limit(limit).all()
+def get_projets(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None):
+    """Récupère la liste des projets (triée par date de création)."""
+    return paginate(db.query(Projet), Projet.date_creation, Projet.id, skip=skip, limit=limit, cursor=cursor)
 
 def create_projet(db: Session, projet: ProjetCreate) -> Projet:
     """Crée un nouveau projet lié à un client."""
@@ -76,6 +88,15 @@ def get_projet(db: Session, projet_id: int) -> Projet | None:
     """Récupère un projet par son ID."""
     return db.query(Projet).filter(Projet.id == projet_id).first()
 
+def get_projet_version(db: Session, projet_id: int) -> Optional[int]:
+    """Version de ligne d'un projet, None s'il n'existe pas."""
+    return db.scalar(select(Projet.version).where(Projet.id == projet_id))
+
+def get_projets_versions(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None):
+    """(id, version, date_creation) de la même page que get_projets."""
+    query = db.query(Projet.id, Projet.version, Projet.date_creation)
+    return paginate(query, Projet.date_creation, Projet.id, skip=skip, limit=limit, cursor=cursor)
+
 def update_projet(db: Session, projet_id: int, projet_data: ProjetUpdate) -> Projet:
     """Met à jour un projet existant."""
     db_projet = db.query(Projet).filter(Projet.id == projet_id).first()
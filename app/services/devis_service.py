@@ -1,6 +1,11 @@
-from typing import List, Optional
-from datetime import datetime
-from sqlalchemy.orm import Session
+import csv
+import io
+from typing import Iterator, List, Optional
+from datetime import datetime, time, timedelta
+import orjson
+from sqlalchemy import Float, Numeric, cast, delete, func, insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, selectinload
 from fastapi import HTTPException, status
 from app.models.devis import (
     Devis,
@@ -8,29 +13,36 @@ from app.models.devis import (
     DevisUpdate,
     LotDevis,
     LignePoste,
+    LignePosteCreate,
+    LignePosteUpdate,
+    LotDevisCreate,
+    LotDevisUpdate,
+    LotEditResponse,
+    LigneEditResponse,
     Facture,
+    RecalculDevisRequest,
+    RecalculDevisResponse,
 )
 from app.models.crm import Projet
+from app.core.cache import devis_cache
+from app.core.pagination import paginate
+from app.services.numerotation_service import (
+    SERIE_AVOIR,
+    SERIE_FACTURE,
+    allocate_number,
+    allocate_numbers,
+)
 
 # --- Statut de Facture ---
 FACTURE_STATUTS = ("Brouillon", "Validée", "Avoir")
 
-
-def get_next_facture_number(db: Session) -> str:
-    """Génère un numéro de facture séquentiel global, inaltérable."""
-    # Recherche le dernier numéro existant (ordre lexicographique)
-    last = db.query(Facture).order_by(Facture.id.desc()).first()
-    if last and last.numero_facture:
-        try:
-            # Format attendu : FAC-YYYYMMDD-XXX
-            prefix, num = last.numero_facture.rsplit("-", 1)
-            next_num = int(num) + 1
-            return f"{prefix}-{next_num:03d}"
-        except Exception:
-            pass
-    # Premier numéro du jour
-    today = datetime.now()
-    return f"FAC-{today.strftime('%Y%m%d')}-001"
+# --- Stratégies de chargement des devis (choisies par endpoint) ---
+# Liste : selectin à chaque niveau, soit 3 requêtes pour toute la page
+# (devis, lots, lignes) quel que soit le nombre de devis, sans produit cartésien.
+DEVIS_LISTE_OPTIONS = (selectinload(Devis.lots).selectinload(LotDevis.lignes_poste),)
+# Détail : les lots viennent dans la même requête que le devis (jointure),
+# les lignes, plus nombreuses, en une seule requête selectin.
+DEVIS_DETAIL_OPTIONS = (joinedload(Devis.lots).selectinload(LotDevis.lignes_poste),)
 
 
 # --- Fonctions de Calcul ---
@@ -63,10 +75,89 @@ def calculate_devis_totals(devis: Devis, lots: List[LotDevis]) -> tuple[float, f
 # --- Opération CRUD de Devis ---
 
 
+def _prepare_devis_rows(
+    devis_data: DevisCreate, client_id: int, user_id: int
+) -> tuple[dict, list[tuple[dict, list[dict]]]]:
+    """
+    Prépare en mémoire les lignes à insérer pour un devis (devis, lots, lignes)
+    et calcule tous les totaux en une seule passe, sans aucun accès à la base.
+    """
+    lots_rows: list[tuple[dict, list[dict]]] = []
+    total_ht = 0.0
+
+    for lot_data in devis_data.lots:
+        lignes_rows: list[dict] = []
+        total_lot_ht = 0.0
+        for ligne_data in lot_data.lignes_poste:
+            total_ligne_ht = calculate_ligne_total(ligne_data)
+            lignes_rows.append({**ligne_data.model_dump(), "total_ligne_ht": total_ligne_ht})
+            total_lot_ht += total_ligne_ht
+
+        total_lot_ht = round(total_lot_ht, 2)
+        lots_rows.append(
+            (
+                {"nom": lot_data.nom, "ordre": lot_data.ordre, "total_lot_ht": total_lot_ht},
+                lignes_rows,
+            )
+        )
+        total_ht += total_lot_ht
+
+    devis_row = {
+        "projet_id": devis_data.projet_id,
+        "client_id": client_id,  # Hérite du client du projet
+        "user_id": user_id,
+        "nom": devis_data.nom,
+        "taux_tva": devis_data.taux_tva,
+        "validite_jours": devis_data.validite_jours,
+        "statut": "Brouillon",
+        "total_ht": round(total_ht, 2),
+        "total_ttc": round(total_ht * (1 + devis_data.taux_tva / 100.0), 2),
+    }
+    return devis_row, lots_rows
+
+
+def _insert_devis_rows(
+    db: Session, prepared: list[tuple[dict, list[tuple[dict, list[dict]]]]]
+) -> list[int]:
+    """
+    Insère un lot de devis préparés avec au plus trois requêtes :
+    un INSERT multi-lignes ... RETURNING pour les devis, un pour les lots,
+    puis un INSERT multi-lignes pour toutes les lignes de poste.
+    """
+    devis_ids = db.scalars(
+        insert(Devis).returning(Devis.id, sort_by_parameter_order=True),
+        [devis_row for devis_row, _ in prepared],
+    ).all()
+
+    lots_rows: list[dict] = []
+    lignes_par_lot: list[list[dict]] = []
+    for devis_id, (_, lots) in zip(devis_ids, prepared):
+        for lot_row, lignes_rows in lots:
+            lots_rows.append({**lot_row, "devis_id": devis_id})
+            lignes_par_lot.append(lignes_rows)
+
+    if lots_rows:
+        lot_ids = db.scalars(
+            insert(LotDevis).returning(LotDevis.id, sort_by_parameter_order=True),
+            lots_rows,
+        ).all()
+        lignes_rows = [
+            {**ligne_row, "lot_id": lot_id}
+            for lot_id, lignes in zip(lot_ids, lignes_par_lot)
+            for ligne_row in lignes
+        ]
+        if lignes_rows:
+            db.execute(insert(LignePoste), lignes_rows)
+
+    return list(devis_ids)
+
+
 def create_full_devis(db: Session, devis_data: DevisCreate, user_id: int) -> Devis:
     """
     Crée un Devis complet, y compris les Lots et les Lignes de Poste,
     et effectue tous les calculs.
+    Les totaux sont calculés en mémoire avant l'écriture, qui se fait par
+    INSERT groupés (nombre de requêtes constant, quelle que soit la taille du devis).
     """
     # 1. Validation de l'existence des entités parentes
     projet = db.query(Projet).get(devis_data.projet_id)
@@ -75,65 +166,97 @@ def create_full_devis(db: Session, devis_data: DevisCreate, user_id: int) -> Dev
             status_code=status.HTTP_404_NOT_FOUND, detail="Projet non trouvé."
         )
 
-    # 2. Création de l'objet Devis de base (sans les totaux finaux)
-    db_devis = Devis(
-        projet_id=devis_data.projet_id,
-        client_id=projet.client_id,  # Hérite du client du projet
-        user_id=user_id,
-        nom=devis_data.nom,
-        taux_tva=devis_data.taux_tva,
-        validite_jours=devis_data.validite_jours,
-        statut="Brouillon",
-    )
-    # L'objet Devis est ajouté, mais pas encore commit
-    db.add(db_devis)
-    db.flush()
-
-    lots_crees: List[LotDevis] = []
+    # 2. Calcul des totaux et écriture groupée
+    prepared = _prepare_devis_rows(devis_data, client_id=projet.client_id, user_id=user_id)
+    (devis_id,) = _insert_devis_rows(db, [prepared])
 
-    # 3. Création des Lots et des Lignes de Poste
-    for lot_data in devis_data.lots:
-        db_lot = LotDevis(devis_id=db_devis.id, nom=lot_data.nom, ordre=lot_data.ordre)
-        db.add(db_lot)
-        db.flush()
-
-        lignes_creees: List[LignePoste] = []
-
-        for ligne_data in lot_data.lignes_poste:
-            # Crée la ligne à partir des données Pydantic
-            db_ligne = LignePoste(**ligne_data.model_dump(), lot_id=db_lot.id)
+    db.commit()
+    return get_devis_by_id(db, devis_id)
 
-            # Calcul du total HT de la ligne
-            db_ligne.total_ligne_ht = calculate_ligne_total(db_ligne)
 
-            db.add(db_ligne)
-            lignes_creees.append(db_ligne)
+def create_bulk_devis(
+    db: Session, devis_list: List[DevisCreate], user_id: int
+) -> List[Devis]:
+    """
+    Crée plusieurs devis complets dans une seule transaction.
+    Tous les devis, lots et lignes sont insérés par requêtes groupées ;
+    si un projet est introuvable, rien n'est écrit.
+    """
+    if not devis_list:
+        return []
 
-        # Calcul du total HT du Lot
-        calculate_lot_total(db_lot, lignes_creees)
-        lots_crees.append(db_lot)
+    projet_ids = {devis_data.projet_id for devis_data in devis_list}
+    clients_par_projet = dict(
+        db.query(Projet.id, Projet.client_id).filter(Projet.id.in_(projet_ids)).all()
+    )
+    manquants = sorted(projet_ids - clients_par_projet.keys())
+    if manquants:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Projet(s) non trouvé(s) : {', '.join(map(str, manquants))}.",
+        )
 
-    # 4. Calcul des Totaux du Devis
-    calculate_devis_totals(db_devis, lots_crees)
+    prepared = [
+        _prepare_devis_rows(
+            devis_data,
+            client_id=clients_par_projet[devis_data.projet_id],
+            user_id=user_id,
+        )
+        for devis_data in devis_list
+    ]
+    devis_ids = _insert_devis_rows(db, prepared)
 
     db.commit()
-    db.refresh(db_devis)
-    return db_devis
+    return (
+        db.query(Devis)
+        .options(*DEVIS_LISTE_OPTIONS)
+        .filter(Devis.id.in_(devis_ids))
+        .order_by(Devis.id)
+        .all()
+    )
 
 
-def get_devis_by_id(db: Session, devis_id: int) -> Devis | None:
-    """Récupère un devis complet par son ID."""
-    return db.query(Devis).filter(Devis.id == devis_id).first()
+def get_devis_by_id(
+    db: Session, devis_id: int, options=DEVIS_DETAIL_OPTIONS
+) -> Devis | None:
+    """Récupère un devis complet par son ID (lots et lignes chargés d'avance)."""
+    return db.query(Devis).options(*options).filter(Devis.id == devis_id).first()
 
 
 def get_all_devis(
-    db: Session, skip: int = 0, limit: int = 100, statut: Optional[str] = None
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    statut: Optional[str] = None,
+    cursor: Optional[str] = None,
+    options=DEVIS_LISTE_OPTIONS,
 ):
-    """Récupère la liste des devis avec filtre optionnel sur le statut."""
-    query = db.query(Devis)
+    """Récupère la liste des devis (triée par date d'émission) avec filtre optionnel sur le statut."""
+    query = _filtrer_devis(db.query(Devis).options(*options), statut)
+    return paginate(query, Devis.date_emission, Devis.id, skip=skip, limit=limit, cursor=cursor)
+
+
+def _filtrer_devis(query, statut: Optional[str]):
     if statut:
         query = query.filter(Devis.statut == statut)
-    return query.offset(skip).limit(limit).all()
+    return query
+
+
+def get_devis_version(db: Session, devis_id: int) -> Optional[int]:
+    """Version de ligne d'un devis (lecture par clé primaire), None s'il n'existe pas."""
+    return db.scalar(select(Devis.version).where(Devis.id == devis_id))
+
+
+def get_devis_versions(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    statut: Optional[str] = None,
+    cursor: Optional[str] = None,
+):
+    """(id, version, date_emission) de la même page que get_all_devis, sans charger lots ni lignes."""
+    query = _filtrer_devis(db.query(Devis.id, Devis.version, Devis.date_emission), statut)
+    return paginate(query, Devis.date_emission, Devis.id, skip=skip, limit=limit, cursor=cursor)
 
 
 def update_devis(db: Session, devis_id: int, devis_data: DevisUpdate) -> Devis:
@@ -156,8 +279,8 @@ def update_devis(db: Session, devis_id: int, devis_data: DevisUpdate) -> Devis:
         setattr(db_devis, field, value)
 
     db.commit()
-    db.refresh(db_devis)
-    return db_devis
+    devis_cache.invalidate(devis_id)
+    return get_devis_by_id(db, devis_id)
 
 
 def delete_devis(db: Session, devis_id: int) -> bool:
@@ -170,21 +293,526 @@ def delete_devis(db: Session, devis_id: int) -> bool:
 
     db.delete(db_devis)
     db.commit()
+    devis_cache.invalidate(devis_id)
     return True
 
 
-# --- Opérations CRUD Factures ---
+# --- Variante asynchrone (route async, AsyncSession) ---
+# Même fonction, exécutée par run_sync : le code SQL est partagé avec la version
+# synchrone, mais les I/O passent par le pilote asynchrone et ne bloquent pas la boucle.
+
+
+async def create_full_devis_async(db: AsyncSession, devis_data: DevisCreate, user_id: int) -> Devis:
+    """create_full_devis sur une AsyncSession."""
+    return await db.run_sync(create_full_devis, devis_data, user_id)
+
+
+# --- Recalcul en masse des totaux (SQL ensembliste) ---
+
+# Nombre de devis recalculés par transaction (keyset sur devis.id).
+RECALCUL_BATCH_SIZE = 5000
+
+
+def _round2(expr):
+    """ROUND(expr, 2) portable : PostgreSQL n'arrondit à n décimales que les NUMERIC."""
+    return cast(func.round(cast(expr, Numeric), 2), Float)
+
+
+def _recalcul_batch(db: Session, devis_ids: List[int]) -> tuple[int, int, int]:
+    """
+    Recalcule lignes, lots puis devis d'une tranche en trois UPDATE ensemblistes.
+    Seules les lignes dont la valeur change sont écrites ; retourne leur nombre par niveau.
+    Un devis dont un lot ou une ligne a changé est réécrit (nouvelle version) même si
+    ses totaux sont inchangés.
+    """
+    lots_de_la_tranche = select(LotDevis.id).where(LotDevis.devis_id.in_(devis_ids))
+
+    # 1. Lignes : total = quantité x prix unitaire
+    total_ligne = _round2(LignePoste.quantite * LignePoste.prix_unitaire_ht)
+    lots_touches = db.scalars(
+        update(LignePoste)
+        .where(
+            LignePoste.lot_id.in_(lots_de_la_tranche),
+            LignePoste.total_ligne_ht.is_distinct_from(total_ligne),
+        )
+        .values(total_ligne_ht=total_ligne)
+        .returning(LignePoste.lot_id)
+        .execution_options(synchronize_session=False)
+    ).all()
+    lignes = len(lots_touches)
+
+    # 2. Lots : somme des lignes (0 pour un lot vide)
+    somme_lignes = _round2(
+        select(func.coalesce(func.sum(LignePoste.total_ligne_ht), 0.0))
+        .where(LignePoste.lot_id == LotDevis.id)
+        .scalar_subquery()
+    )
+    devis_des_lots = db.scalars(
+        update(LotDevis)
+        .where(
+            LotDevis.devis_id.in_(devis_ids),
+            LotDevis.total_lot_ht.is_distinct_from(somme_lignes),
+        )
+        .values(total_lot_ht=somme_lignes)
+        .returning(LotDevis.devis_id)
+        .execution_options(synchronize_session=False)
+    ).all()
+    lots = len(devis_des_lots)
+    devis_touches = set(devis_des_lots)
+    if lots_touches:
+        devis_touches.update(
+            db.scalars(
+                select(LotDevis.devis_id).where(LotDevis.id.in_(set(lots_touches)))
+            ).all()
+        )
+
+    # 3. Devis : HT = somme des lots, TTC = HT x (1 + TVA)
+    somme_lots = (
+        select(func.coalesce(func.sum(LotDevis.total_lot_ht), 0.0))
+        .where(LotDevis.devis_id == Devis.id)
+        .scalar_subquery()
+    )
+    total_ht = _round2(somme_lots)
+    total_ttc = _round2(somme_lots * (1 + Devis.taux_tva / 100.0))
+    devis = db.execute(
+        update(Devis)
+        .where(
+            Devis.id.in_(devis_ids),
+            or_(
+                Devis.total_ht.is_distinct_from(total_ht),
+                Devis.total_ttc.is_distinct_from(total_ttc),
+                Devis.id.in_(devis_touches),
+            ),
+        )
+        .values(total_ht=total_ht, total_ttc=total_ttc)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+    return lignes, lots, devis
+
+
+def recalculate_devis_totals(
+    db: Session, filtre: RecalculDevisRequest
+) -> RecalculDevisResponse:
+    """
+    Recalcule en base les totaux des lignes, lots et devis correspondant au filtre
+    (statut, projet, période d'émission), par tranches de RECALCUL_BATCH_SIZE devis
+    validées chacune dans sa propre transaction. En mode dry_run, rien n'est enregistré.
+    """
+    ids_query = select(Devis.id)
+    if filtre.statut:
+        ids_query = ids_query.where(Devis.statut == filtre.statut)
+    if filtre.projet_id is not None:
+        ids_query = ids_query.where(Devis.projet_id == filtre.projet_id)
+    if filtre.date_debut:
+        ids_query = ids_query.where(
+            Devis.date_emission >= datetime.combine(filtre.date_debut, time.min)
+        )
+    if filtre.date_fin:
+        ids_query = ids_query.where(
+            Devis.date_emission < datetime.combine(filtre.date_fin + timedelta(days=1), time.min)
+        )
+
+    examines = lignes = lots = devis = 0
+    last_id = 0
+    while True:
+        devis_ids = db.scalars(
+            ids_query.where(Devis.id > last_id).order_by(Devis.id).limit(RECALCUL_BATCH_SIZE)
+        ).all()
+        if not devis_ids:
+            break
+
+        l, lt, d = _recalcul_batch(db, devis_ids)
+        if filtre.dry_run:
+            db.rollback()
+        else:
+            db.commit()
+            if l or lt or d:
+                # Une seule invalidation globale plutôt qu'une par devis de la tranche
+                devis_cache.clear()
+
+        examines += len(devis_ids)
+        lignes += l
+        lots += lt
+        devis += d
+        last_id = devis_ids[-1]
+
+    return RecalculDevisResponse(
+        devis_examines=examines,
+        lignes_modifiees=lignes,
+        lots_modifies=lots,
+        devis_modifies=devis,
+        dry_run=filtre.dry_run,
+    )
+
+
+# --- Édition unitaire des lots et lignes (maintenance incrémentale des totaux) ---
+
+
+def _appliquer_delta(
+    db: Session, devis_id: int, delta: float, lot_id: Optional[int] = None
+) -> tuple[Optional[float], float, float]:
+    """
+    Répercute un écart de HT sur le lot (optionnel) puis sur le devis par des
+    UPDATE relatifs (total = total + delta) : coût constant quelle que soit la
+    taille du devis, et pas de mise à jour perdue entre deux éditions concurrentes.
+    Retourne (total_lot_ht, total_ht, total_ttc) après application.
+    """
+    total_lot_ht = None
+    if lot_id is not None:
+        total_lot_ht = db.execute(
+            update(LotDevis)
+            .where(LotDevis.id == lot_id)
+            .values(total_lot_ht=_round2(func.coalesce(LotDevis.total_lot_ht, 0.0) + delta))
+            .returning(LotDevis.total_lot_ht)
+            .execution_options(synchronize_session=False)
+        ).scalar_one()
+
+    total_ht = func.coalesce(Devis.total_ht, 0.0) + delta
+    nouveaux_totaux = db.execute(
+        update(Devis)
+        .where(Devis.id == devis_id)
+        .values(
+            total_ht=_round2(total_ht),
+            total_ttc=_round2(total_ht * (1 + Devis.taux_tva / 100.0)),
+        )
+        .returning(Devis.total_ht, Devis.total_ttc)
+        .execution_options(synchronize_session=False)
+    ).one()
+    return total_lot_ht, nouveaux_totaux.total_ht, nouveaux_totaux.total_ttc
+
+
+def _toucher_devis(db: Session, devis_id: int) -> None:
+    """Incrémente la version du devis quand seul un lot ou une ligne change (ETag)."""
+    db.execute(
+        update(Devis)
+        .where(Devis.id == devis_id)
+        .values(version=Devis.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _get_devis_or_404(db: Session, devis_id: int) -> Devis:
+    db_devis = db.get(Devis, devis_id)
+    if not db_devis:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Devis non trouvé."
+        )
+    return db_devis
+
+
+def _get_lot_or_404(db: Session, devis_id: int, lot_id: int) -> LotDevis:
+    db_lot = (
+        db.query(LotDevis)
+        .filter(LotDevis.id == lot_id, LotDevis.devis_id == devis_id)
+        .with_for_update()
+        .first()
+    )
+    if not db_lot:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Lot non trouvé."
+        )
+    return db_lot
+
+
+def _get_ligne_or_404(
+    db: Session, devis_id: int, lot_id: int, ligne_id: int
+) -> LignePoste:
+    db_ligne = (
+        db.query(LignePoste)
+        .join(LotDevis, LotDevis.id == LignePoste.lot_id)
+        .filter(
+            LignePoste.id == ligne_id,
+            LignePoste.lot_id == lot_id,
+            LotDevis.devis_id == devis_id,
+        )
+        .with_for_update(of=LignePoste)
+        .first()
+    )
+    if not db_ligne:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Ligne de poste non trouvée."
+        )
+    return db_ligne
+
+
+def add_lot(db: Session, devis_id: int, lot_data: LotDevisCreate) -> LotEditResponse:
+    """Ajoute un lot (et ses lignes) à un devis existant ; le total du lot s'ajoute au devis."""
+    _get_devis_or_404(db, devis_id)
+
+    lignes_rows = []
+    total_lot_ht = 0.0
+    for ligne_data in lot_data.lignes_poste:
+        total_ligne_ht = calculate_ligne_total(ligne_data)
+        lignes_rows.append({**ligne_data.model_dump(), "total_ligne_ht": total_ligne_ht})
+        total_lot_ht += total_ligne_ht
+    total_lot_ht = round(total_lot_ht, 2)
+
+    lot_id = db.scalars(
+        insert(LotDevis)
+        .values(devis_id=devis_id, nom=lot_data.nom, ordre=lot_data.ordre, total_lot_ht=total_lot_ht)
+        .returning(LotDevis.id)
+    ).one()
+    if lignes_rows:
+        db.execute(insert(LignePoste), [{**row, "lot_id": lot_id} for row in lignes_rows])
+
+    _, total_ht, total_ttc = _appliquer_delta(db, devis_id, total_lot_ht)
+    db.commit()
+    devis_cache.invalidate(devis_id)
+    return LotEditResponse(lot=db.get(LotDevis, lot_id), total_ht=total_ht, total_ttc=total_ttc)
+
+
+def update_lot(
+    db: Session, devis_id: int, lot_id: int, lot_data: LotDevisUpdate
+) -> LotEditResponse:
+    """Renomme ou réordonne un lot (les totaux ne changent pas)."""
+    db_lot = _get_lot_or_404(db, devis_id, lot_id)
+    for field, value in lot_data.model_dump(exclude_unset=True).items():
+        setattr(db_lot, field, value)
+    _toucher_devis(db, devis_id)
+    db.commit()
+    devis_cache.invalidate(devis_id)
+
+    db_devis = db.get(Devis, devis_id)
+    return LotEditResponse(lot=db_lot, total_ht=db_devis.total_ht, total_ttc=db_devis.total_ttc)
+
+
+def delete_lot(db: Session, devis_id: int, lot_id: int) -> bool:
+    """Supprime un lot et ses lignes ; son total est retranché du devis."""
+    db_lot = _get_lot_or_404(db, devis_id, lot_id)
+    delta = -(db_lot.total_lot_ht or 0.0)
+
+    db.execute(delete(LignePoste).where(LignePoste.lot_id == lot_id))
+    db.execute(delete(LotDevis).where(LotDevis.id == lot_id))
+    _appliquer_delta(db, devis_id, delta)
+    db.commit()
+    devis_cache.invalidate(devis_id)
+    return True
+
+
+def add_ligne(
+    db: Session, devis_id: int, lot_id: int, ligne_data: LignePosteCreate
+) -> LigneEditResponse:
+    """Ajoute une ligne à un lot ; son total s'ajoute au lot et au devis."""
+    _get_lot_or_404(db, devis_id, lot_id)
+
+    db_ligne = LignePoste(**ligne_data.model_dump(), lot_id=lot_id)
+    db_ligne.total_ligne_ht = calculate_ligne_total(db_ligne)
+    db.add(db_ligne)
+    db.flush()
+
+    total_lot_ht, total_ht, total_ttc = _appliquer_delta(
+        db, devis_id, db_ligne.total_ligne_ht, lot_id=lot_id
+    )
+    db.commit()
+    devis_cache.invalidate(devis_id)
+    return LigneEditResponse(
+        ligne=db_ligne, total_lot_ht=total_lot_ht, total_ht=total_ht, total_ttc=total_ttc
+    )
+
+
+def update_ligne(
+    db: Session, devis_id: int, lot_id: int, ligne_id: int, ligne_data: LignePosteUpdate
+) -> LigneEditResponse:
+    """Modifie une ligne ; seul l'écart entre l'ancien et le nouveau total est répercuté."""
+    db_ligne = _get_ligne_or_404(db, devis_id, lot_id, ligne_id)
+    ancien_total = db_ligne.total_ligne_ht or 0.0
+
+    for field, value in ligne_data.model_dump(exclude_unset=True).items():
+        setattr(db_ligne, field, value)
+    db_ligne.total_ligne_ht = calculate_ligne_total(db_ligne)
+    db.flush()
+
+    total_lot_ht, total_ht, total_ttc = _appliquer_delta(
+        db, devis_id, db_ligne.total_ligne_ht - ancien_total, lot_id=lot_id
+    )
+    db.commit()
+    devis_cache.invalidate(devis_id)
+    return LigneEditResponse(
+        ligne=db_ligne, total_lot_ht=total_lot_ht, total_ht=total_ht, total_ttc=total_ttc
+    )
 
 
-def generate_facture_number(db: Session) -> str:
-    """Génère un numéro de facture unique au format FAC-YYYYMMDD-XXX."""
-    today = datetime.now()
-    prefix = f"FAC-{today.strftime('%Y%m%d')}"
+def delete_ligne(db: Session, devis_id: int, lot_id: int, ligne_id: int) -> bool:
+    """Supprime une ligne ; son total est retranché du lot et du devis."""
+    db_ligne = _get_ligne_or_404(db, devis_id, lot_id, ligne_id)
+    delta = -(db_ligne.total_ligne_ht or 0.0)
 
-    # Compte les factures du jour pour incrémenter
-    count = db.query(Facture).filter(Facture.numero_facture.like(f"{prefix}%")).count()
+    db.delete(db_ligne)
+    db.flush()
+    _appliquer_delta(db, devis_id, delta, lot_id=lot_id)
+    db.commit()
+    devis_cache.invalidate(devis_id)
+    return True
+
+
+# --- Export en flux (NDJSON / CSV) ---
+
+# Nombre de devis traités par tranche (keyset sur devis.id).
+EXPORT_DEVIS_BATCH_SIZE = 500
+# Nombre de lignes lues par aller-retour sur le curseur serveur.
+EXPORT_YIELD_PER = 2000
+# Taille (en caractères) des morceaux envoyés au client.
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+EXPORT_CSV_COLUMNS = (
+    "devis_id",
+    "devis_nom",
+    "statut",
+    "date_emission",
+    "projet_id",
+    "client_id",
+    "taux_tva",
+    "total_ht",
+    "total_ttc",
+    "lot_id",
+    "lot_nom",
+    "lot_ordre",
+    "total_lot_ht",
+    "ligne_id",
+    "designation",
+    "unite",
+    "quantite",
+    "prix_unitaire_ht",
+    "total_ligne_ht",
+)
 
-    return f"{prefix}-{count + 1:03d}"
+
+def _export_rows(db: Session, statut: Optional[str] = None) -> Iterator:
+    """
+    Parcourt devis, lots et lignes à plat, par tranches de devis prises dans
+    l'ordre de la clé primaire (keyset) : le tri ne porte que sur une tranche,
+    le premier octet part donc immédiatement. Chaque tranche est lue via un
+    curseur serveur (yield_per) et aucun graphe ORM n'est construit.
+    """
+    columns = select(
+        Devis.id.label("devis_id"),
+        Devis.nom.label("devis_nom"),
+        Devis.statut,
+        Devis.date_emission,
+        Devis.projet_id,
+        Devis.client_id,
+        Devis.taux_tva,
+        Devis.total_ht,
+        Devis.total_ttc,
+        LotDevis.id.label("lot_id"),
+        LotDevis.nom.label("lot_nom"),
+        LotDevis.ordre.label("lot_ordre"),
+        LotDevis.total_lot_ht,
+        LignePoste.id.label("ligne_id"),
+        LignePoste.designation,
+        LignePoste.unite,
+        LignePoste.quantite,
+        LignePoste.prix_unitaire_ht,
+        LignePoste.total_ligne_ht,
+    )
+    last_id = 0
+    while True:
+        ids_query = select(Devis.id).where(Devis.id > last_id)
+        if statut:
+            ids_query = ids_query.where(Devis.statut == statut)
+        devis_ids = db.scalars(
+            ids_query.order_by(Devis.id).limit(EXPORT_DEVIS_BATCH_SIZE)
+        ).all()
+        if not devis_ids:
+            return
+
+        stmt = (
+            columns.outerjoin(LotDevis, LotDevis.devis_id == Devis.id)
+            .outerjoin(LignePoste, LignePoste.lot_id == LotDevis.id)
+            .where(Devis.id.in_(devis_ids))
+            .order_by(Devis.id, LotDevis.ordre, LotDevis.id, LignePoste.id)
+            .execution_options(yield_per=EXPORT_YIELD_PER)
+        )
+        yield from db.execute(stmt)
+        last_id = devis_ids[-1]
+
+
+def _chunked(parts: Iterator[str]) -> Iterator[str]:
+    """Regroupe les fragments en morceaux d'environ EXPORT_CHUNK_SIZE caractères."""
+    buffer: List[str] = []
+    size = 0
+    for part in parts:
+        buffer.append(part)
+        size += len(part)
+        if size >= EXPORT_CHUNK_SIZE:
+            yield "".join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def _iter_devis_ndjson(rows) -> Iterator[str]:
+    """Un devis (avec ses lots et lignes imbriqués) par ligne JSON."""
+    devis = None
+    lot = None
+    for row in rows:
+        if devis is None or row.devis_id != devis["id"]:
+            if devis is not None:
+                yield orjson.dumps(devis).decode() + "\n"
+            devis = {
+                "id": row.devis_id,
+                "nom": row.devis_nom,
+                "statut": row.statut,
+                "date_emission": row.date_emission.isoformat() if row.date_emission else None,
+                "projet_id": row.projet_id,
+                "client_id": row.client_id,
+                "taux_tva": row.taux_tva,
+                "total_ht": row.total_ht,
+                "total_ttc": row.total_ttc,
+                "lots": [],
+            }
+            lot = None
+        if row.lot_id is None:
+            continue
+        if lot is None or row.lot_id != lot["id"]:
+            lot = {
+                "id": row.lot_id,
+                "nom": row.lot_nom,
+                "ordre": row.lot_ordre,
+                "total_lot_ht": row.total_lot_ht,
+                "lignes_poste": [],
+            }
+            devis["lots"].append(lot)
+        if row.ligne_id is not None:
+            lot["lignes_poste"].append(
+                {
+                    "id": row.ligne_id,
+                    "designation": row.designation,
+                    "unite": row.unite,
+                    "quantite": row.quantite,
+                    "prix_unitaire_ht": row.prix_unitaire_ht,
+                    "total_ligne_ht": row.total_ligne_ht,
+                }
+            )
+    if devis is not None:
+        yield orjson.dumps(devis).decode() + "\n"
+
+
+def _iter_devis_csv(rows) -> Iterator[str]:
+    """Une ligne CSV par ligne de poste (les colonnes devis/lot sont répétées)."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_CSV_COLUMNS)
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+    yield buffer.getvalue()
+
+
+def iter_devis_export(
+    db: Session, export_format: str = "ndjson", statut: Optional[str] = None
+) -> Iterator[str]:
+    """Génère l'export complet des devis, morceau par morceau, au format NDJSON ou CSV."""
+    rows = _export_rows(db, statut=statut)
+    if export_format == "csv":
+        return _chunked(_iter_devis_csv(rows))
+    return _chunked(_iter_devis_ndjson(rows))
+
+
+# --- Opérations CRUD Factures ---
 
 
 def create_facture(db: Session, devis_id: int) -> Facture:
@@ -212,7 +840,8 @@ def create_facture(db: Session, devis_id: int) -> Facture:
             status_code=400, detail="Une facture validée existe déjà pour ce devis."
         )
 
-    numero = get_next_facture_number(db)
+    # Numéro réservé en dernier : le compteur n'est verrouillé que jusqu'au commit
+    numero = allocate_number(db, SERIE_FACTURE)
     db_facture = Facture(
         devis_id=devis_id,
         numero_facture=numero,
@@ -226,6 +855,60 @@ def create_facture(db: Session, devis_id: int) -> Facture:
     return db_facture
 
 
+def create_factures_bulk(db: Session, devis_ids: List[int]) -> List[Facture]:
+    """
+    Génère les factures de plusieurs devis validés en une transaction.
+    Les numéros sont réservés en un seul bloc, dans l'ordre des devis demandés.
+    """
+    devis_ids = list(dict.fromkeys(devis_ids))
+    if not devis_ids:
+        return []
+
+    devis_par_id = {
+        d.id: d for d in db.query(Devis).filter(Devis.id.in_(devis_ids)).all()
+    }
+    manquants = [i for i in devis_ids if i not in devis_par_id]
+    if manquants:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Devis non trouvé(s) : {', '.join(map(str, manquants))}.",
+        )
+    non_valides = [i for i in devis_ids if devis_par_id[i].statut not in ["Validé", "Accepté"]]
+    if non_valides:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Devis non validés ou acceptés : {', '.join(map(str, non_valides))}.",
+        )
+    deja_factures = [
+        devis_id
+        for (devis_id,) in db.query(Facture.devis_id)
+        .filter(Facture.devis_id.in_(devis_ids), Facture.statut == "Validée")
+        .distinct()
+    ]
+    if deja_factures:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Une facture validée existe déjà pour les devis : {', '.join(map(str, sorted(deja_factures)))}.",
+        )
+
+    numeros = allocate_numbers(db, SERIE_FACTURE, len(devis_ids))
+    factures = [
+        Facture(
+            devis_id=devis_id,
+            numero_facture=numero,
+            total_ht=devis_par_id[devis_id].total_ht,
+            total_ttc=devis_par_id[devis_id].total_ttc,
+            statut="Validée",
+        )
+        for devis_id, numero in zip(devis_ids, numeros)
+    ]
+    db.add_all(factures)
+    db.commit()
+    for facture in factures:
+        db.refresh(facture)
+    return factures
+
+
 def update_facture(db: Session, facture_id: int, data: dict) -> Facture:
     """Interdit la modification d'une facture validée (hors création d'un avoir)."""
     db_facture = db.query(Facture).filter(Facture.id == facture_id).first()
@@ -250,7 +933,7 @@ def create_avoir(
     db_facture = db.query(Facture).filter(Facture.id == facture_id).first()
     if not db_facture or db_facture.statut != "Validée":
         raise HTTPException(status_code=404, detail="Facture validée non trouvée.")
-    numero_avoir = get_next_facture_number(db).replace("FAC", "AVOIR")
+    numero_avoir = allocate_number(db, SERIE_AVOIR)
     avoir = Facture(
         devis_id=db_facture.devis_id,
         numero_facture=numero_avoir,
@@ -266,9 +949,28 @@ def create_avoir(
     return avoir
 
 
-def get_all_factures(db: Session, skip: int = 0, limit: int = 100):
-    """Récupère la liste des factures avec pagination."""
-    return db.query(Facture).offset(skip).limit(limit).all()
+def get_all_factures(
+    db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None
+):
+    """Récupère la liste des factures (triée par date d'émission) avec pagination."""
+    return paginate(
+        db.query(Facture), Facture.date_emission, Facture.id, skip=skip, limit=limit, cursor=cursor
+    )
+
+
+def get_factures_versions(
+    db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None
+):
+    """(id, version, date_emission) de la même page que get_all_factures."""
+    return paginate(
+        db.query(Facture.id, Facture.version, Facture.date_emission),
+        Facture.date_emission, Facture.id, skip=skip, limit=limit, cursor=cursor,
+    )
+
+
+def get_facture_version(db: Session, facture_id: int) -> Optional[int]:
+    """Version de ligne d'une facture, None si elle n'existe pas."""
+    return db.scalar(select(Facture.version).where(Facture.id == facture_id))
 
 
 def get_facture_by_id(db: Session, facture_id: int) -> Facture | None:
@@ -278,4 +980,13 @@ def get_facture_by_id(db: Session, facture_id: int) -> Facture | None:
 
 def get_factures_by_devis(db: Session, devis_id: int):
     """Récupère toutes les factures liées à un devis."""
-    return db.query(Facture).filter(Facture.devis_id == devis_id).all()
+    return db.query(Facture).filter(Facture.devis_id == devis_id).order_by(Facture.id).all()
+
+
+def get_factures_by_devis_versions(db: Session, devis_id: int):
+    """(id, version) des factures d'un devis, dans l'ordre de get_factures_by_devis."""
+    return db.execute(
+        select(Facture.id, Facture.version)
+        .where(Facture.devis_id == devis_id)
+        .order_by(Facture.id)
+    ).all()
@@ -0,0 +1,70 @@
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.devis import CompteurNumerotation
+
+# --- Séries de numérotation légale ---
+SERIE_FACTURE = "FAC"
+SERIE_AVOIR = "AVOIR"
+
+
+def format_numero(serie: str, numero: int, date_emission: Optional[datetime] = None) -> str:
+    """Format d'affichage : SERIE-AAAAMMJJ-NNN (le compteur, lui, ne repart jamais à zéro)."""
+    jour = (date_emission or datetime.now()).strftime("%Y%m%d")
+    return f"{serie}-{jour}-{numero:03d}"
+
+
+def _reserver(db: Session, serie: str, count: int) -> int:
+    """
+    Incrémente le compteur de la série de `count` en une seule instruction et
+    retourne le dernier numéro réservé. La ligne du compteur reste verrouillée
+    jusqu'à la fin de la transaction appelante.
+    """
+    stmt = (
+        update(CompteurNumerotation)
+        .where(CompteurNumerotation.serie == serie)
+        .values(dernier_numero=CompteurNumerotation.dernier_numero + count)
+        .returning(CompteurNumerotation.dernier_numero)
+        .execution_options(synchronize_session=False)
+    )
+    dernier = db.execute(stmt).scalar_one_or_none()
+    if dernier is None:
+        # Première utilisation de la série : création du compteur
+        try:
+            with db.begin_nested():
+                db.add(CompteurNumerotation(serie=serie, dernier_numero=0))
+        except IntegrityError:
+            pass  # créé entre-temps par une transaction concurrente
+        dernier = db.execute(stmt).scalar_one()
+    return dernier
+
+
+def allocate_numbers(
+    db: Session, serie: str, count: int, date_emission: Optional[datetime] = None
+) -> List[str]:
+    """
+    Réserve un bloc de `count` numéros consécutifs dans la série (facturation groupée).
+
+    Les numéros ne deviennent définitifs qu'avec le commit de la transaction
+    appelante, qui doit les utiliser tous ; en cas de rollback, le compteur
+    revient en arrière avec elle : ni trou, ni doublon, même en parallèle.
+    À appeler le plus tard possible avant le commit pour limiter le verrouillage.
+    """
+    if count < 1:
+        raise ValueError("Le nombre de numéros à réserver doit être positif.")
+    dernier = _reserver(db, serie, count)
+    return [
+        format_numero(serie, numero, date_emission)
+        for numero in range(dernier - count + 1, dernier + 1)
+    ]
+
+
+def allocate_number(
+    db: Session, serie: str, date_emission: Optional[datetime] = None
+) -> str:
+    """Réserve le prochain numéro de la série (voir allocate_numbers)."""
+    return allocate_numbers(db, serie, 1, date_emission)[0]
@@ -0,0 +1,156 @@
+"""
+Mise en page PDF des devis et factures.
+
+Ce module est exécuté dans les processus du pool de rendu : il ne dépend que de
+reportlab et de données simples (dict), jamais de la base ni de l'application.
+"""
+import io
+import os
+from xml.sax.saxutils import escape
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import mm
+from reportlab.platypus import Image, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+# Tout changement de mise en page : incrémenter pdf_service.TEMPLATE_VERSION (invalide le cache).
+
+
+def _euros(value) -> str:
+    return f"{value or 0:,.2f} €".replace(",", " ").replace(".", ",")
+
+
+def _lots_flowables(lots, styles) -> list:
+    """Un tableau par lot : désignation, unité, quantité, PU HT, total HT."""
+    flowables = []
+    for lot in lots:
+        flowables.append(Paragraph(escape(f"{lot['ordre']}. {lot['nom']}"), styles["Heading3"]))
+        rows = [["Désignation", "Unité", "Qté", "PU HT", "Total HT"]]
+        for ligne in lot["lignes_poste"]:
+            rows.append(
+                [
+                    Paragraph(escape(ligne["designation"] or ""), styles["BodyText"]),
+                    ligne["unite"] or "",
+                    f"{ligne['quantite'] or 0:g}",
+                    _euros(ligne["prix_unitaire_ht"]),
+                    _euros(ligne["total_ligne_ht"]),
+                ]
+            )
+        rows.append(["", "", "", "Total lot", _euros(lot["total_lot_ht"])])
+        table = Table(rows, colWidths=[85 * mm, 15 * mm, 15 * mm, 25 * mm, 30 * mm], repeatRows=1)
+        table.setStyle(
+            TableStyle(
+                [
+                    ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
+                    ("ALIGN", (2, 1), (-1, -1), "RIGHT"),
+                    ("VALIGN", (0, 0), (-1, -1), "TOP"),
+                    ("LINEBELOW", (0, 0), (-1, 0), 0.5, colors.black),
+                    ("LINEABOVE", (0, -1), (-1, -1), 0.5, colors.black),
+                    ("FONTNAME", (3, -1), (-1, -1), "Helvetica-Bold"),
+                ]
+            )
+        )
+        flowables += [table, Spacer(1, 4 * mm)]
+    return flowables
+
+
+def _totaux_table(rows) -> Table:
+    table = Table(rows, colWidths=[40 * mm, 35 * mm], hAlign="RIGHT")
+    table.setStyle(
+        TableStyle(
+            [
+                ("ALIGN", (1, 0), (1, -1), "RIGHT"),
+                ("FONTNAME", (0, -1), (-1, -1), "Helvetica-Bold"),
+                ("LINEABOVE", (0, -1), (-1, -1), 0.5, colors.black),
+            ]
+        )
+    )
+    return table
+
+
+def _entete(document, styles) -> list:
+    client = document["client"]
+    lignes = [
+        client.get("nom_societe"),
+        " ".join(filter(None, [client.get("prenom_contact"), client.get("nom_contact")])),
+        client.get("adresse"),
+    ]
+    return [
+        Paragraph("<br/>".join(escape(l) for l in lignes if l), styles["Normal"]),
+        Spacer(1, 4 * mm),
+        Paragraph(escape(f"Projet : {document['projet_nom'] or ''}"), styles["Normal"]),
+        Spacer(1, 6 * mm),
+    ]
+
+
+def _build(flowables) -> bytes:
+    buffer = io.BytesIO()
+    SimpleDocTemplate(
+        buffer, pagesize=A4, leftMargin=15 * mm, rightMargin=15 * mm, topMargin=15 * mm, bottomMargin=15 * mm
+    ).build(flowables)
+    return buffer.getvalue()
+
+
+def render_devis_pdf(document: dict) -> bytes:
+    """Rend le PDF d'un devis à partir de son instantané (voir pdf_service.devis_document)."""
+    styles = getSampleStyleSheet()
+    flowables = [
+        Paragraph(escape(f"Devis n° {document['id']} — {document['nom']}"), styles["Title"]),
+        Paragraph(
+            f"Émis le {document['date_emission'][:10] if document['date_emission'] else ''}"
+            f" — valable {document['validite_jours']} jours — statut : {document['statut']}",
+            styles["Normal"],
+        ),
+        Spacer(1, 6 * mm),
+    ]
+    flowables += _entete(document, styles)
+    flowables += _lots_flowables(document["lots"], styles)
+    flowables.append(
+        _totaux_table(
+            [
+                ["Total HT", _euros(document["total_ht"])],
+                [f"TVA {document['taux_tva']:g} %", _euros(document["total_ttc"] - document["total_ht"])],
+                ["Total TTC", _euros(document["total_ttc"])],
+            ]
+        )
+    )
+    signature = document.get("signature")
+    if signature and os.path.exists(signature["path"]):
+        flowables += [
+            Spacer(1, 10 * mm),
+            Paragraph("Bon pour accord :", styles["Normal"]),
+            Image(signature["path"], width=60 * mm, height=25 * mm, kind="proportional"),
+        ]
+    return _build(flowables)
+
+
+def render_facture_pdf(document: dict) -> bytes:
+    """Rend le PDF d'une facture (ou d'un avoir) avec le détail du devis d'origine."""
+    styles = getSampleStyleSheet()
+    devis = document["devis"]
+    titre = "Avoir" if document["statut"] == "Avoir" else "Facture"
+    flowables = [
+        Paragraph(f"{titre} n° {document['numero_facture']}", styles["Title"]),
+        Paragraph(
+            f"Émise le {document['date_emission'][:10] if document['date_emission'] else ''}"
+            + (f" — prestation du {document['date_prestation'][:10]}" if document["date_prestation"] else "")
+            + f" — devis n° {devis['id']}",
+            styles["Normal"],
+        ),
+        Spacer(1, 6 * mm),
+    ]
+    flowables += _entete(devis, styles)
+    flowables += _lots_flowables(devis["lots"], styles)
+    flowables.append(
+        _totaux_table(
+            [
+                ["Total HT", _euros(document["total_ht"])],
+                ["TVA", _euros((document["total_ttc"] or 0) - (document["total_ht"] or 0))],
+                ["Total TTC", _euros(document["total_ttc"])],
+            ]
+        )
+    )
+    if document["mention_franchise_tva"]:
+        flowables += [Spacer(1, 6 * mm), Paragraph(escape(document["mention_franchise_tva"]), styles["Italic"])]
+    return _build(flowables)
@@ -0,0 +1,229 @@
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from app.core.config import PDF_CACHE_DIR, PDF_CACHE_MAX_FILES, PDF_CACHE_PRUNE_EVERY, PDF_RENDER_WORKERS
+from app.models.crm import Client, Projet
+from app.models.devis import Devis
+from app.services import devis_service
+
+# Version de la mise en page de app.services.pdf_render, incluse dans l'empreinte du cache :
+# à incrémenter à chaque changement de mise en page. Définie ici pour que le calcul de la
+# clé n'importe pas reportlab.
+TEMPLATE_VERSION = 1
+
+# Fonctions de rendu de app.services.pdf_render, par type de document
+RENDERERS = {
+    "devis": "render_devis_pdf",
+    "facture": "render_facture_pdf",
+}
+
+# Pool de processus dédié à la mise en page (créé au premier rendu).
+_pool: Optional[ProcessPoolExecutor] = None
+# Rendus en cours (rendu + écriture), pour qu'une même version ne soit calculée qu'une fois.
+_inflight: Dict[str, asyncio.Task] = {}
+# PDF écrits par ce processus, pour n'élaguer le cache que toutes les PDF_CACHE_PRUNE_EVERY écritures.
+_writes = 0
+
+
+def _pdf_render():
+    # Import différé : reportlab n'est chargé qu'au premier PDF, pas au démarrage du worker
+    from app.services import pdf_render
+    return pdf_render
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn : les processus de rendu n'héritent ni des connexions DB ni des threads du serveur
+        _pool = ProcessPoolExecutor(
+            max_workers=PDF_RENDER_WORKERS, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _pool
+
+
+def shutdown_pool() -> None:
+    """Arrête le pool de rendu (arrêt de l'application)."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+# --- Instantanés des documents (données simples, hachables et transmissibles au pool) ---
+
+
+def devis_document(db: Session, devis_id: int) -> dict | None:
+    """Instantané complet d'un devis : tout ce qui apparaît sur le PDF, et rien d'autre."""
+    devis = devis_service.get_devis_by_id(db, devis_id)
+    if not devis:
+        return None
+    return _devis_snapshot(db, devis)
+
+
+def _devis_snapshot(db: Session, devis: Devis) -> dict:
+    client = db.get(Client, devis.client_id) if devis.client_id else None
+    projet = db.get(Projet, devis.projet_id) if devis.projet_id else None
+    signature = None
+    if devis.signature_path and os.path.exists(devis.signature_path):
+        stat = os.stat(devis.signature_path)
+        # Taille et date de modification suffisent à invalider le cache si le PNG change
+        signature = {"path": devis.signature_path, "size": stat.st_size, "mtime": stat.st_mtime_ns}
+    return {
+        "id": devis.id,
+        "nom": devis.nom,
+        "statut": devis.statut,
+        "date_emission": devis.date_emission.isoformat() if devis.date_emission else None,
+        "validite_jours": devis.validite_jours,
+        "taux_tva": devis.taux_tva,
+        "total_ht": devis.total_ht,
+        "total_ttc": devis.total_ttc,
+        "projet_nom": projet.nom if projet else None,
+        "client": {
+            "nom_societe": client.nom_societe,
+            "nom_contact": client.nom_contact,
+            "prenom_contact": client.prenom_contact,
+            "adresse": client.adresse,
+        }
+        if client
+        else {},
+        "signature": signature,
+        "lots": [
+            {
+                "nom": lot.nom,
+                "ordre": lot.ordre,
+                "total_lot_ht": lot.total_lot_ht,
+                "lignes_poste": [
+                    {
+                        "designation": ligne.designation,
+                        "unite": ligne.unite,
+                        "quantite": ligne.quantite,
+                        "prix_unitaire_ht": ligne.prix_unitaire_ht,
+                        "total_ligne_ht": ligne.total_ligne_ht,
+                    }
+                    for ligne in sorted(lot.lignes_poste, key=lambda l: l.id)
+                ],
+            }
+            for lot in sorted(devis.lots, key=lambda l: (l.ordre or 0, l.id))
+        ],
+    }
+
+
+def facture_document(db: Session, facture_id: int) -> dict | None:
+    """Instantané d'une facture, avec le détail du devis d'origine."""
+    facture = devis_service.get_facture_by_id(db, facture_id)
+    if not facture:
+        return None
+    devis = devis_service.get_devis_by_id(db, facture.devis_id)
+    if not devis:
+        return None  # devis d'origine supprimé : pas de document à rendre
+    return {
+        "numero_facture": facture.numero_facture,
+        "statut": facture.statut,
+        "date_emission": facture.date_emission.isoformat() if facture.date_emission else None,
+        "date_prestation": facture.date_prestation.isoformat() if facture.date_prestation else None,
+        "total_ht": facture.total_ht,
+        "total_ttc": facture.total_ttc,
+        "mention_franchise_tva": facture.mention_franchise_tva,
+        "devis": _devis_snapshot(db, devis),
+    }
+
+
+# --- Cache disque par empreinte du contenu ---
+
+
+def cache_key(kind: str, document: dict) -> str:
+    """Empreinte SHA-256 du contenu : toute modification du document change la clé."""
+    payload = json.dumps(
+        {"template": TEMPLATE_VERSION, "kind": kind, "document": document},
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _write_atomic(path: str, content: bytes) -> None:
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def _prune_cache() -> None:
+    """Supprime les PDF les moins récemment servis au-delà de PDF_CACHE_MAX_FILES."""
+    entries = []
+    for entry in os.scandir(PDF_CACHE_DIR):
+        if not entry.name.endswith(".pdf"):
+            continue
+        try:
+            entries.append((entry.stat().st_mtime, entry.path))
+        except FileNotFoundError:
+            pass  # supprimé entre-temps par un autre worker
+    if len(entries) <= PDF_CACHE_MAX_FILES:
+        return
+    entries.sort()
+    for _, path in entries[: len(entries) - PDF_CACHE_MAX_FILES]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _store(path: str, content: bytes, prune: bool) -> None:
+    os.makedirs(PDF_CACHE_DIR, exist_ok=True)
+    _write_atomic(path, content)
+    if prune:
+        _prune_cache()
+
+
+def _lookup(kind: str, document: dict) -> tuple[str, str, bool]:
+    """
+    (clé, chemin, en cache ?) du PDF du document. Rafraîchit la récence d'un PDF en
+    cache ; un fichier absent (ou élagué entre-temps) compte comme un échec.
+    """
+    key = cache_key(kind, document)
+    path = os.path.join(PDF_CACHE_DIR, f"{kind}-{key}.pdf")
+    try:
+        os.utime(path)  # récence pour l'éviction
+    except FileNotFoundError:
+        return key, path, False
+    return key, path, True
+
+
+async def _render_and_store(kind: str, document: dict, path: str) -> None:
+    global _writes
+    # Premier import de reportlab (module de rendu) dans le threadpool, lui aussi
+    renderer = getattr(await run_in_threadpool(_pdf_render), RENDERERS[kind])
+    loop = asyncio.get_running_loop()
+    content = await loop.run_in_executor(_get_pool(), renderer, document)
+    _writes += 1
+    await run_in_threadpool(_store, path, content, _writes % PDF_CACHE_PRUNE_EVERY == 0)
+
+
+async def get_pdf_path(kind: str, document: dict) -> str:
+    """
+    Retourne le chemin du PDF du document, rendu dans le pool de processus si
+    cette version exacte n'est pas déjà en cache. La boucle d'événements n'est
+    jamais bloquée : mise en page dans le pool, accès disque dans le threadpool.
+    """
+    # Empreinte (sérialisation et SHA-256 de tout l'instantané) et accès disque hors de la boucle
+    key, path, cached = await run_in_threadpool(_lookup, kind, document)
+    if cached:
+        return path
+
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_render_and_store(kind, document, path))
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    # shield : une requête annulée (client parti) n'interrompt pas le rendu attendu par les autres
+    await asyncio.shield(task)
+    return path
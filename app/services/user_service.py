@@ -1,10 +1,15 @@
+from sqlalchemy import delete, insert, or_, select, update
 from sqlalchemy.orm import Session
 from datetime import timedelta, datetime
 from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from typing import Optional
 
-from app.models.user import User, UserCreate, UserUpdate
-from app.core.security import get_password_hash, verify_password, create_access_token, create_refresh_token
+from app.models.user import CurrentUser, RefreshToken, User, UserCreate, UserUpdate
+from app.core.cache import user_cache
+from app.core.pagination import paginate
+from app.core.hashing import hash_password, hash_password_async, verify_password_async
+from app.core.security import password_needs_rehash, create_access_token, create_refresh_token, hash_refresh_token
 
 # --- Opérations CRUD pour l'utilisateur ---
 
@@ -14,8 +19,8 @@ def get_user_by_email(db: Session, email: str) -> User | None:
 
 def create_user(db: Session, user: UserCreate) -> User:
     """Crée un nouvel utilisateur (version simplifiée et réparée)."""
-    # Cette ligne appellera maintenant notre nouveau code sans bug
-    hashed_password = get_password_hash(user.password)
+    # bcrypt est calculé dans le pool de processus dédié
+    hashed_password = hash_password(user.password)
     
     db_user = User(
         email=user.email,
@@ -30,66 +35,184 @@ def create_user(db: Session, user: UserCreate) -> User:
 
 # --- Logique d'Authentification ---
 
-def authenticate_user(db: Session, email: str, password: str) -> User | None:
-    """Authentifie un utilisateur par email et mot de passe."""
-    user = get_user_by_email(db, email=email)
+async def authenticate_user(db: Session, email: str, password: str) -> User | None:
+    """
+    Authentifie un utilisateur par email et mot de passe. La vérification bcrypt
+    tourne dans le pool dédié ; si le hash date d'un ancien coût (BCRYPT_ROUNDS),
+    il est recalculé au coût actuel puisque le mot de passe en clair est connu.
+    """
+    user = await run_in_threadpool(_get_user_detached, db, email)
     if not user:
         return None
     
     # Vérifie le mot de passe haché
-    if not verify_password(password, user.hashed_password):
+    if not await verify_password_async(password, user.hashed_password):
         return None
+
+    if password_needs_rehash(user.hashed_password):
+        user.hashed_password = await hash_password_async(password)
+        await run_in_threadpool(_save_password_hash, db, user.id, user.hashed_password)
     
     return user
 
-def create_user_access_token(user: User) -> str:
+def _get_user_detached(db: Session, email: str) -> User | None:
+    """
+    Charge l'utilisateur puis rend la connexion au pool : aucune connexion SQL
+    n'est immobilisée pendant le calcul bcrypt.
+    """
+    user = get_user_by_email(db, email=email)
+    if user:
+        db.expunge(user)
+    db.rollback()
+    return user
+
+def _save_password_hash(db: Session, user_id: int, hashed_password: str) -> None:
+    db.query(User).filter(User.id == user_id).update({"hashed_password": hashed_password})
+    db.commit()
+
+def _token_claims(user: User | CurrentUser) -> dict:
+    # 'sub' est la convention pour l'identité dans JWT ; 'tv' la génération des jetons
+    return {"sub": user.email, "tv": user.token_version or 0}
+
+def create_user_access_token(user: User | CurrentUser) -> str:
     """Génère un token d'accès pour un utilisateur."""
     # Le temps d'expiration est défini dans app.core.config
-    access_token = create_access_token(
-        data={"sub": user.email} # 'sub' est la convention pour l'identité dans JWT
-    )
-    return access_token
+    return create_access_token(data=_token_claims(user))
 
 
-def create_user_tokens(user: User) -> dict:
+def create_user_tokens(user: User | CurrentUser) -> dict:
     """Retourne à la fois access_token et refresh_token pour un utilisateur."""
-    access_token = create_access_token(data={"sub": user.email})
-    refresh_token = create_refresh_token(data={"sub": user.email})
+    access_token = create_access_token(data=_token_claims(user))
+    refresh_token = create_refresh_token(data=_token_claims(user))
     return {"access_token": access_token, "refresh_token": refresh_token}
 
 
-def create_user_access_token_from_email(email: str) -> str:
-    """Génère un access token à partir d'un email (utile pour refresh endpoint)."""
-    # Cette fonction ne touche pas à la DB; elle génère un token basé sur l'email.
-    return create_access_token(data={"sub": email})
+def token_is_current(payload: dict, user: CurrentUser) -> bool:
+    """Vrai si le jeton appartient à la génération actuelle (jetons antérieurs sans 'tv' : 0)."""
+    return payload.get("tv", 0) == user.token_version
+
+
+def get_current_identity(db: Session, email: str) -> CurrentUser | None:
+    """
+    Identité (id, email, rôle, actif, génération des jetons) servie par user_cache,
+    invalidé à chaque modification de l'utilisateur ; lecture en base sinon.
+    """
+    cached = user_cache.get(email)
+    if cached is not None:
+        return CurrentUser.model_validate_json(cached)
+    generation = user_cache.generation()
+    db_user = get_user_by_email(db, email=email)
+    if db_user is None:
+        return None
+    user = CurrentUser.model_validate(db_user)
+    user_cache.set(email, user.model_dump_json().encode(), generation)
+    return user
+
+
+def revoke_all_tokens(db: Session, user_id: int) -> int:
+    """
+    Déconnecte l'utilisateur partout : une seule écriture (token_version + 1) rend
+    caducs tous ses jetons d'accès et de rafraîchissement. Retourne la nouvelle génération.
+    """
+    row = db.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(token_version=User.token_version + 1)
+        .returning(User.email, User.token_version)
+    ).one_or_none()
+    if row is None:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Utilisateur non trouvé."
+        )
+    db.commit()
+    user_cache.invalidate(row.email)
+    return row.token_version
 
 
 def save_refresh_token(db: Session, user_id: int, refresh_token: str, expires_at: datetime) -> None:
-    """Enregistre un refresh token en base pour l'utilisateur."""
-    from app.models.user import RefreshToken
-    db_token = RefreshToken(user_id=user_id, token=refresh_token, expires_at=expires_at, revoked=False)
+    """Enregistre (l'empreinte d') un refresh token en base pour l'utilisateur."""
+    db_token = RefreshToken(
+        user_id=user_id, token_hash=hash_refresh_token(refresh_token), expires_at=expires_at, revoked=False
+    )
     db.add(db_token)
     db.commit()
 
 
 def get_refresh_record(db: Session, token: str):
-    """Récupère l'enregistrement du refresh token s'il existe et n'est pas révoqué."""
-    from app.models.user import RefreshToken
-    return db.query(RefreshToken).filter(RefreshToken.token == token).first()
+    """Récupère l'enregistrement du refresh token s'il existe (révoqué ou non)."""
+    return db.query(RefreshToken).filter(RefreshToken.token_hash == hash_refresh_token(token)).first()
 
 
 def revoke_refresh_token(db: Session, token: str) -> None:
     """Marque un refresh token comme révoqué."""
-    rec = get_refresh_record(db, token)
-    if rec:
-        rec.revoked = True
-        db.commit()
+    db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.token_hash == hash_refresh_token(token))
+        .values(revoked=True)
+    )
+    db.commit()
 
 
-def rotate_refresh_token(db: Session, old_token: str, new_token: str, new_expires_at: datetime, user_id: int) -> None:
-    """Révoque l'ancien token et enregistre le nouveau."""
-    revoke_refresh_token(db, old_token)
-    save_refresh_token(db, user_id=user_id, refresh_token=new_token, expires_at=new_expires_at)
+def rotate_refresh_token(db: Session, old_token: str, new_token: str, new_expires_at: datetime) -> Optional[int]:
+    """
+    Révoque l'ancien token et enregistre le nouveau dans une seule transaction.
+    La révocation est conditionnelle (ancien token encore valide) : si deux rotations
+    du même token se croisent, une seule aboutit. Retourne l'id de l'utilisateur,
+    ou None si l'ancien token est inconnu ou déjà révoqué (rien n'est écrit).
+    """
+    user_id = db.execute(
+        update(RefreshToken)
+        .where(
+            RefreshToken.token_hash == hash_refresh_token(old_token),
+            RefreshToken.revoked.is_(False),
+        )
+        .values(revoked=True)
+        .returning(RefreshToken.user_id)
+    ).scalar_one_or_none()
+    if user_id is None:
+        db.rollback()
+        return None
+    db.execute(
+        insert(RefreshToken).values(
+            user_id=user_id,
+            token_hash=hash_refresh_token(new_token),
+            expires_at=new_expires_at,
+            revoked=False,
+        )
+    )
+    db.commit()
+    return user_id
+
+
+# Nombre de lignes supprimées par transaction lors de la compaction
+REFRESH_TOKEN_COMPACTION_BATCH = 1000
+
+
+def compact_refresh_tokens(
+    db: Session, batch_size: int = REFRESH_TOKEN_COMPACTION_BATCH, now: Optional[datetime] = None
+) -> int:
+    """
+    Supprime les refresh tokens expirés ou révoqués, par tranches de `batch_size`
+    (une transaction courte par tranche, pour ne pas verrouiller la table).
+    Retourne le nombre de lignes supprimées.
+    """
+    now = now or datetime.utcnow()
+    obsoletes = (
+        select(RefreshToken.id)
+        .where(or_(RefreshToken.expires_at < now, RefreshToken.revoked.is_(True)))
+        .limit(batch_size)
+    )
+    total = 0
+    while True:
+        ids = db.scalars(obsoletes).all()
+        if not ids:
+            break
+        db.execute(delete(RefreshToken).where(RefreshToken.id.in_(ids)))
+        db.commit()
+        total += len(ids)
+    return total
 
 
 # --- Opérations CRUD supplémentaires ---
@@ -98,12 +221,12 @@ def get_user_by_id(db: Session, user_id: int) -> User | None:
     """Récupère un utilisateur par son ID."""
     return db.query(User).filter(User.id == user_id).first()
 
-def get_all_users(db: Session, skip: int = 0, limit: int = 100, role: Optional[str] = None):
-    """Récupère la liste des utilisateurs avec filtre optionnel sur le rôle."""
+def get_all_users(db: Session, skip: int = 0, limit: int = 100, role: Optional[str] = None, cursor: Optional[str] = None):
+    """Récupère la liste des utilisateurs (triée par date de création) avec filtre optionnel sur le rôle."""
     query = db.query(User)
     if role:
         query = query.filter(User.role == role)
-    return query.offset(skip).limit(limit).all()
+    return paginate(query, User.date_creation, User.id, skip=skip, limit=limit, cursor=cursor)
 
 def update_user(db: Session, user_id: int, user_data: UserUpdate) -> User:
     """Met à jour un utilisateur existant."""
@@ -118,14 +241,16 @@ def update_user(db: Session, user_id: int, user_data: UserUpdate) -> User:
 
     # Si le mot de passe est fourni, le hasher
     if "password" in update_data and update_data["password"]:
-        update_data["hashed_password"] = get_password_hash(update_data.pop("password"))
+        update_data["hashed_password"] = hash_password(update_data.pop("password"))
     elif "password" in update_data:
         del update_data["password"]
 
+    ancien_email = db_user.email
     for field, value in update_data.items():
         setattr(db_user, field, value)
 
     db.commit()
+    user_cache.invalidate(ancien_email, db_user.email)
     db.refresh(db_user)
     return db_user
 
@@ -138,8 +263,10 @@ def delete_user(db: Session, user_id: int) -> bool:
             detail="Utilisateur non trouvé."
         )
 
+    email = db_user.email
     db.delete(db_user)
     db.commit()
+    user_cache.invalidate(email)
     return True
 
 def toggle_user_active(db: Session, user_id: int) -> User:
@@ -153,5 +280,6 @@ def toggle_user_active(db: Session, user_id: int) -> User:
 
     db_user.is_active = not db_user.is_active
     db.commit()
+    user_cache.invalidate(db_user.email)
     db.refresh(db_user)
     return db_user
\ No newline at end of file
@@ -0,0 +1 @@
+# Benchmarks de performance de l'API (hors production).
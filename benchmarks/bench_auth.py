@@ -0,0 +1,79 @@
+"""
+Micro-benchmark du coût d'authentification par requête.
+
+Mesure, pour un même jeton réutilisé (cas d'une session) :
+  - jwt.decode avec vérification de signature (chemin d'origine) ;
+  - decode_access_token avec la mémoïsation des jetons vérifiés ;
+  - la dépendance get_current_user complète, sans puis avec mémoïsation
+    (utilisateur déjà en cache dans les deux cas).
+
+Usage :
+    python -m benchmarks.bench_auth --iterations 20000
+"""
+import argparse
+import os
+import timeit
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench_auth.db")
+
+from jose import jwt  # noqa: E402
+
+from app.core import security  # noqa: E402
+from app.core.cache import token_cache  # noqa: E402
+from app.core.database import Base, SessionLocal, engine  # noqa: E402
+from app.dependencies import get_current_user  # noqa: E402
+from app.models.user import User  # noqa: E402
+
+EMAIL = "bench-auth@example.com"
+
+
+def seed() -> None:
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        db.add(User(email=EMAIL, hashed_password="x", full_name="Bench", role="admin"))
+        db.commit()
+    finally:
+        db.close()
+
+
+def mesure(nom: str, fn, iterations: int) -> float:
+    fn()  # préchauffage (remplit les caches)
+    duree = min(timeit.repeat(fn, number=iterations, repeat=3))
+    us = duree / iterations * 1e6
+    print(f"{nom:45s} {us:8.2f} µs/requête")
+    return us
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    seed()
+    token = security.create_access_token({"sub": EMAIL})
+    db = SessionLocal()
+    try:
+        sans = mesure(
+            "jwt.decode (vérification à chaque requête)",
+            lambda: jwt.decode(token, security.SECRET_KEY, algorithms=[security.ALGORITHM]),
+            args.iterations,
+        )
+        avec = mesure("decode_access_token (mémoïsé)", lambda: security.decode_access_token(token), args.iterations)
+        print(f"{'':45s} gain x{sans / avec:.1f}")
+
+        token_cache.clear()
+        seuil = security.TOKEN_CACHE_MAX_ENTRIES
+        security.TOKEN_CACHE_MAX_ENTRIES = 0
+        sans = mesure("get_current_user, sans mémoïsation", lambda: get_current_user(db, token), args.iterations)
+        security.TOKEN_CACHE_MAX_ENTRIES = seuil
+        avec = mesure("get_current_user, avec mémoïsation", lambda: get_current_user(db, token), args.iterations)
+        print(f"{'':45s} gain x{sans / avec:.1f}")
+        print(token_cache.stats())
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Benchmark du débit de connexion (/auth/token) pendant un pic de connexions.
+
+Lance N connexions simultanées et mesure, pendant le pic, la latence d'un
+endpoint léger (GET /) pour vérifier que le reste de l'API ne se fige pas.
+Compare le chemin historique (bcrypt dans le handler synchrone, donc dans le
+pool de threads) au chemin actuel (bcrypt dans le pool de processus dédié).
+
+Usage :
+    python -m benchmarks.bench_login --connexions 200
+    BCRYPT_ROUNDS=10 PASSWORD_HASH_WORKERS=4 python -m benchmarks.bench_login
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench_login.db")
+
+import httpx  # noqa: E402
+from fastapi import Depends, HTTPException  # noqa: E402
+from fastapi.security import OAuth2PasswordRequestForm  # noqa: E402
+
+from app.core import hashing  # noqa: E402
+from app.core.database import Base, SessionLocal, engine, get_db  # noqa: E402
+from app.core.security import get_password_hash, verify_password  # noqa: E402
+from app.main import app  # noqa: E402
+from app.routers import auth as auth_router  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.services import user_service  # noqa: E402
+
+EMAIL = "bench-login@example.com"
+PASSWORD = "mot-de-passe-bench"
+
+
+@app.post("/bench/legacy-token", include_in_schema=False)
+def legacy_login(form_data: OAuth2PasswordRequestForm = Depends(), db=Depends(get_db)):
+    """Chemin d'origine : bcrypt exécuté en ligne dans un thread du serveur."""
+    user = user_service.get_user_by_email(db, email=form_data.username)
+    if not user or not verify_password(form_data.password, user.hashed_password):
+        raise HTTPException(status_code=401)
+    return auth_router._issue_tokens(db, user, None)
+
+
+def seed() -> None:
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        db.add(User(email=EMAIL, hashed_password=get_password_hash(PASSWORD), full_name="Bench", role="admin"))
+        db.commit()
+    finally:
+        db.close()
+
+
+async def burst(client: httpx.AsyncClient, url: str, connexions: int) -> dict:
+    stop = asyncio.Event()
+    sondes = []
+
+    async def sonde():
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            await client.get("/")
+            sondes.append((time.perf_counter() - t0) * 1000)
+            await asyncio.sleep(0.01)
+
+    async def login():
+        r = await client.post(url, data={"username": EMAIL, "password": PASSWORD})
+        return r.status_code
+
+    tache_sonde = asyncio.create_task(sonde())
+    t0 = time.perf_counter()
+    codes = await asyncio.gather(*(login() for _ in range(connexions)))
+    duree = time.perf_counter() - t0
+    stop.set()
+    await tache_sonde
+
+    sondes.sort()
+    return {
+        "ok": codes.count(200),
+        "503": codes.count(503),
+        "duree_s": duree,
+        "debit": codes.count(200) / duree,
+        "sonde_p50_ms": statistics.median(sondes) if sondes else 0.0,
+        "sonde_max_ms": sondes[-1] if sondes else 0.0,
+    }
+
+
+async def run(connexions: int) -> None:
+    seed()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Préchauffage : démarrage des processus du pool
+        await client.post("/auth/token", data={"username": EMAIL, "password": PASSWORD})
+        for nom, url in (("historique (threads)", "/bench/legacy-token"), ("pool dédié", "/auth/token")):
+            r = await burst(client, url, connexions)
+            print(
+                f"{nom:22s} {r['ok']:4d} ok, {r['503']:4d} x 503 en {r['duree_s']:.2f} s "
+                f"({r['debit']:.1f} connexions/s) | GET / pendant le pic : "
+                f"p50 {r['sonde_p50_ms']:.1f} ms, max {r['sonde_max_ms']:.1f} ms"
+            )
+    hashing.shutdown_pool()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--connexions", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(run(args.connexions))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Benchmark de la sérialisation JSON des réponses (DevisResponse, FactureResponse, listes).
+
+Objets ORM construits en mémoire (aucune requête SQL) : seule la sérialisation est
+mesurée, pour chaque taille de charge et chaque chemin :
+  - json.dumps : validation, dump_python(mode="json") puis json.dumps
+    (JSONResponse d'origine) ;
+  - orjson sur dict : même validation, puis orjson.dumps (ORJSONResponse) ;
+  - TypeAdapter.dump_json : validation puis écriture par pydantic-core
+    (response_model de FastAPI, FAST_SERIALIZATION=false) ;
+  - ResponseSerializer : copie directe des attributs et orjson, sans revalidation
+    (app.core.serialization, chemin par défaut).
+Les quatre sorties sont d'abord comparées : le benchmark échoue si elles diffèrent.
+
+Usage :
+    python -m benchmarks.bench_serialization
+    python -m benchmarks.bench_serialization --json var/benchmarks/serialization.json
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+from typing import List
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench_serialization.db")
+
+import orjson  # noqa: E402
+
+from app.core.serialization import adapter, serializer  # noqa: E402
+from app.models.devis import (  # noqa: E402
+    Devis,
+    DevisResponse,
+    Facture,
+    FactureResponse,
+    LignePoste,
+    LotDevis,
+)
+from benchmarks import harness  # noqa: E402
+
+DEBUT = datetime(2025, 1, 1, 8, 30)
+
+
+def make_devis(devis_id: int, lots: int, lignes: int) -> Devis:
+    ligne_id = devis_id * 100000
+    lots_orm = []
+    for ordre in range(1, lots + 1):
+        lignes_orm = []
+        for n in range(lignes):
+            ligne_id += 1
+            lignes_orm.append(LignePoste(
+                id=ligne_id, designation=f"Poste {n} — fourniture et pose", unite="m2",
+                quantite=float(n % 40 + 1), prix_unitaire_ht=12.5, total_ligne_ht=12.5 * (n % 40 + 1),
+            ))
+        lots_orm.append(LotDevis(id=devis_id * 1000 + ordre, nom=f"Lot {ordre}", ordre=ordre,
+                                 total_lot_ht=1000.0, lignes_poste=lignes_orm))
+    return Devis(
+        id=devis_id, projet_id=1, client_id=1, user_id=1, nom=f"Devis {devis_id}", statut="Envoyé",
+        date_emission=DEBUT + timedelta(days=devis_id), taux_tva=20.0, validite_jours=30,
+        total_ht=1000.0 * lots, total_ttc=1200.0 * lots, lots=lots_orm,
+    )
+
+
+def make_facture(facture_id: int) -> Facture:
+    return Facture(
+        id=facture_id, devis_id=facture_id, numero_facture=f"FAC-2025-{facture_id:06d}", statut="Validée",
+        total_ht=1234.5, total_ttc=1481.4, date_emission=DEBUT + timedelta(hours=facture_id),
+        date_prestation=None, mention_franchise_tva=None,
+    )
+
+
+def strategies(model, many: bool) -> dict:
+    ta = adapter(List[model] if many else model)
+    s = serializer(model)
+    fast = s.dumps_many if many else s.dumps
+    return {
+        "json.dumps": lambda obj: json.dumps(ta.dump_python(ta.validate_python(obj), mode="json")).encode(),
+        "orjson sur dict": lambda obj: orjson.dumps(ta.dump_python(ta.validate_python(obj), mode="json")),
+        "TypeAdapter.dump_json": lambda obj: ta.dump_json(ta.validate_python(obj)),
+        "ResponseSerializer": fast,
+    }
+
+
+def cases() -> list:
+    """(nom, modèle, liste ?, charge, tours)"""
+    return [
+        ("DevisResponse[1x10]", DevisResponse, False, make_devis(1, 1, 10), 2000),
+        ("DevisResponse[10x200]", DevisResponse, False, make_devis(2, 10, 200), 50),
+        ("DevisResponse[20x100]", DevisResponse, False, make_devis(3, 20, 100), 50),
+        ("FactureResponse", FactureResponse, False, make_facture(1), 5000),
+        ("List[FactureResponse][100]", FactureResponse, True, [make_facture(i) for i in range(100)], 500),
+        ("List[FactureResponse][1000]", FactureResponse, True, [make_facture(i) for i in range(1000)], 50),
+        ("List[DevisResponse][10x(2x5)]", DevisResponse, True,
+         [make_devis(i, 2, 5) for i in range(10)], 500),
+        ("List[DevisResponse][100x(2x5)]", DevisResponse, True,
+         [make_devis(i, 2, 5) for i in range(100)], 50),
+    ]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rounds-factor", type=float, default=1.0)
+    parser.add_argument("--only", help="ne lancer que les cas dont le nom contient ce texte")
+    parser.add_argument("--json", help="fichier de résultats (format de benchmarks.harness)")
+    parser.add_argument("--compare", help="fichier de résultats de référence")
+    parser.add_argument("--max-regression", type=float, default=0.25)
+    args = parser.parse_args()
+
+    session = harness.BenchmarkSession(rounds_factor=args.rounds_factor, only=args.only)
+    for name, model, many, payload, rounds in cases():
+        chemins = strategies(model, many)
+        sorties = {chemin: orjson.loads(fn(payload)) for chemin, fn in chemins.items()}
+        reference = sorties["TypeAdapter.dump_json"]
+        differents = [chemin for chemin, sortie in sorties.items() if sortie != reference]
+        if differents:
+            print(f"ÉCHEC {name} : sortie différente pour {', '.join(differents)}")
+            return 1
+        taille = len(chemins["ResponseSerializer"](payload))
+        for chemin, fn in chemins.items():
+            session.run(chemin, lambda fn=fn: fn(payload), group=f"serialization.{name}",
+                        rounds=rounds, extra_info={"octets": taille})
+
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        harness.save(args.json, session, {"benchmark": "serialization"})
+        if args.compare:
+            regressions = harness.compare(harness.load(args.compare), harness.load(args.json),
+                                          args.max_regression)
+            if regressions:
+                return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""
+Vérifie le budget de temps d'import de l'application (démarrage à froid).
+
+Importe `app.main` dans un interpréteur neuf avec `python -X importtime` et
+échoue (code de sortie non nul) si l'import dépasse le budget. La base pointe
+vers un fichier inaccessible : toute connexion pendant l'import ferait échouer
+la vérification (l'import doit rester sans effet de bord).
+
+Usage :
+    python -m benchmarks.check_import_time [--budget-ms 1500] [--runs 3]
+"""
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+MODULE = "app.main"
+
+
+def measure_import(module: str) -> tuple[int, list[tuple[int, str]]]:
+    """Temps cumulé d'import de `module` (µs) et détail des imports de premier niveau."""
+    env = dict(os.environ, DATABASE_URL="sqlite:////nonexistent/import_check.db")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import de {module} en échec :\n{result.stderr[-2000:]}")
+
+    total = None
+    top_level = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        if not cumulative.strip().isdigit():
+            continue  # ligne d'en-tête
+        if name.strip() == module:
+            total = int(cumulative)
+        elif name.startswith("   ") and not name.startswith("    "):
+            top_level.append((int(cumulative), name.strip()))  # importé directement par le module
+    if total is None:
+        raise RuntimeError(f"{module} absent de la sortie -X importtime")
+    return total, sorted(top_level, reverse=True)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--budget-ms", type=float, default=float(os.getenv("IMPORT_TIME_BUDGET_MS", 1500))
+    )
+    parser.add_argument("--runs", type=int, default=3, help="le meilleur essai est retenu")
+    args = parser.parse_args()
+
+    mesures = [measure_import(MODULE) for _ in range(args.runs)]
+    total, detail = min(mesures, key=lambda m: m[0])
+    total_ms = total / 1000
+
+    print(f"{MODULE} : {total_ms:.0f} ms (budget {args.budget_ms:.0f} ms, meilleur de {args.runs})")
+    for cumulative, name in detail[:8]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+    if total_ms > args.budget_ms:
+        print("ÉCHEC : budget d'import dépassé")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+"""
+Vérifie le budget de requêtes SQL des endpoints de lecture des devis.
+
+Échoue (code de sortie non nul) si GET /devis/ ou GET /devis/{id} dépasse
+le nombre de requêtes autorisé, pour qu'un N+1 ne puisse pas revenir.
+
+Usage :
+    python -m benchmarks.check_query_budget
+"""
+import os
+import sys
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./query_budget.db")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.core.database import Base, SessionLocal, engine  # noqa: E402
+from app.core.query_counter import assert_max_queries  # noqa: E402
+from app.core.security import create_access_token  # noqa: E402
+from app.main import app  # noqa: E402
+from app.services import devis_service  # noqa: E402
+from benchmarks.bench_create_devis import build_payload, seed  # noqa: E402
+
+# Requête d'authentification comprise (get_current_user).
+BUDGETS = {
+    "/devis/?limit=100": 5,
+    "/devis/{devis_id}": 4,
+}
+
+
+def main() -> int:
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        user_id, projet_id = seed(db)
+        devis = devis_service.create_bulk_devis(
+            db, [build_payload(projet_id, nb_lots=3, nb_lignes=5) for _ in range(100)], user_id
+        )
+        devis_id = devis[0].id
+    finally:
+        db.close()
+
+    client = TestClient(app)
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'bench@example.com'})}"}
+
+    failures = 0
+    for path, budget in BUDGETS.items():
+        url = path.format(devis_id=devis_id)
+        try:
+            with assert_max_queries(budget) as counter:
+                response = client.get(url, headers=headers)
+            response.raise_for_status()
+            print(f"OK   {url} : {counter.count} requêtes (budget {budget})")
+        except AssertionError as e:
+            failures += 1
+            print(f"ÉCHEC {url} : {e}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
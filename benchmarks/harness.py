@@ -0,0 +1,150 @@
+"""
+Mesure, résultats JSON et détection des régressions pour la suite de benchmarks.
+
+Les statistiques et le fichier de résultats reprennent les noms de pytest-benchmark
+(min, max, mean, stddev, median, iqr, ops, rounds ; benchmarks[].stats), si bien
+qu'un fichier de l'un se compare à un fichier de l'autre.
+"""
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+FORMAT_VERSION = 1
+
+
+def _stats(timings: list) -> dict:
+    ordonnes = sorted(timings)
+    q1, _, q3 = statistics.quantiles(ordonnes, n=4) if len(ordonnes) > 1 else (ordonnes[0],) * 3
+    mean = statistics.fmean(ordonnes)
+    return {
+        "min": ordonnes[0],
+        "max": ordonnes[-1],
+        "mean": mean,
+        "stddev": statistics.stdev(ordonnes) if len(ordonnes) > 1 else 0.0,
+        "median": statistics.median(ordonnes),
+        "iqr": q3 - q1,
+        "q1": q1,
+        "q3": q3,
+        "rounds": len(ordonnes),
+        "ops": 1 / mean if mean else 0.0,
+    }
+
+
+class BenchmarkSession:
+    """Exécute des benchmarks nommés et accumule leurs statistiques (secondes)."""
+
+    def __init__(self, rounds_factor: float = 1.0, only: Optional[str] = None):
+        self.rounds_factor = rounds_factor
+        self.only = only
+        self.results: list = []
+
+    def run(
+        self,
+        name: str,
+        fn: Callable[[], object],
+        group: str,
+        rounds: int = 50,
+        warmup: int = 3,
+        setup: Optional[Callable[[], None]] = None,
+        extra_info: Optional[dict] = None,
+    ) -> Optional[dict]:
+        """
+        Chronomètre `fn` sur `rounds` tours après `warmup` tours non mesurés.
+        `setup` s'exécute avant chaque tour, hors mesure.
+        """
+        if self.only and self.only not in f"{group}::{name}":
+            return None
+        rounds = max(3, int(rounds * self.rounds_factor))
+        for _ in range(warmup):
+            if setup:
+                setup()
+            fn()
+        timings = []
+        for _ in range(rounds):
+            if setup:
+                setup()
+            debut = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - debut)
+        result = {
+            "group": group,
+            "name": name,
+            "fullname": f"{group}::{name}",
+            "stats": _stats(timings),
+            "extra_info": extra_info or {},
+        }
+        self.results.append(result)
+        stats = result["stats"]
+        print(
+            f"{result['fullname']:55s} médiane {stats['median'] * 1000:9.3f} ms  "
+            f"min {stats['min'] * 1000:9.3f} ms  iqr {stats['iqr'] * 1000:8.3f} ms  ({stats['rounds']} tours)"
+        )
+        return result
+
+
+def _commit_info() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, timeout=5, check=True
+        ).stdout.strip()
+        dirty = bool(subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            capture_output=True, text=True, timeout=5,
+        ).stdout.strip())
+    except (OSError, subprocess.SubprocessError):
+        return {}
+    return {"id": commit, "dirty": dirty}
+
+
+def save(path: str, session: BenchmarkSession, context: dict) -> None:
+    """Écrit le fichier de résultats (format pytest-benchmark, plus `context`)."""
+    document = {
+        "version": FORMAT_VERSION,
+        "datetime": datetime.now(timezone.utc).isoformat(),
+        "machine_info": {
+            "node": platform.node(),
+            "machine": platform.machine(),
+            "system": platform.system(),
+            "release": platform.release(),
+            "python_version": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+        },
+        "commit_info": _commit_info(),
+        "context": context,
+        "benchmarks": session.results,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=2, ensure_ascii=False)
+
+
+def load(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(baseline: dict, current: dict, max_regression: float, stat: str = "median") -> list:
+    """
+    Compare deux fichiers de résultats, benchmark par benchmark (`fullname`).
+    Renvoie les régressions : `stat` courant > `stat` de référence x (1 + max_regression).
+    """
+    reference = {b["fullname"]: b["stats"] for b in baseline["benchmarks"]}
+    if baseline.get("context") != current.get("context"):
+        print(f"Attention : contexte différent de la référence ({baseline.get('context')}).")
+    regressions = []
+    for bench in current["benchmarks"]:
+        ref = reference.get(bench["fullname"])
+        if ref is None:
+            print(f"{bench['fullname']:55s} nouveau")
+            continue
+        avant, apres = ref[stat], bench["stats"][stat]
+        ecart = (apres - avant) / avant if avant else 0.0
+        verdict = "RÉGRESSION" if ecart > max_regression else "ok"
+        print(f"{bench['fullname']:55s} {avant * 1000:9.3f} -> {apres * 1000:9.3f} ms ({ecart:+7.1%}) {verdict}")
+        if ecart > max_regression:
+            regressions.append((bench["fullname"], avant, apres, ecart))
+    return regressions
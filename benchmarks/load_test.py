@@ -0,0 +1,326 @@
+"""
+Test de charge : rejoue un mélange de requêtes réaliste et compare les latences aux SLO.
+
+N utilisateurs virtuels (--concurrency) enchaînent, sans pause par défaut, des
+requêtes tirées selon les poids de SCENARIOS : connexions, création de devis,
+listes et détail de devis, liste des projets, pointages (écriture et lecture),
+lecture du journal de chantier. Chaque utilisateur virtuel a son propre
+générateur aléatoire (graine fixe) : la suite de requêtes est reproductible.
+
+Le rapport donne, par endpoint, le débit et les latences p50/p95/p99, comparés
+aux SLO déclarés (SLOS). Code de sortie 1 si un SLO n'est pas tenu ou si le taux
+d'erreurs dépasse --max-error-rate.
+
+Cibles :
+- en processus (défaut) : l'application est appelée via ASGI, la base est recréée
+  et remplie par benchmarks.dataset. Client et serveur partagent le processus :
+  comparer des exécutions entre elles, pas avec la production ;
+- serveur local (--url) : la base du serveur doit avoir été remplie au préalable
+  avec la même taille et la même graine, par exemple :
+    DATABASE_URL=... python -m benchmarks.dataset --size small
+    DATABASE_URL=... uvicorn app.main:app --workers 4
+    python -m benchmarks.load_test --url http://127.0.0.1:8000 --size small
+
+Usage :
+    python -m benchmarks.load_test --concurrency 20 --duration 30
+    python -m benchmarks.load_test --url http://127.0.0.1:8000 --concurrency 50 --json var/load.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from dataclasses import asdict, dataclass
+from datetime import date, datetime, timedelta
+from typing import Callable, Optional
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./load_test.db")
+os.environ.setdefault("SLOW_REQUEST_MS", "0")
+os.environ.setdefault("SLOW_QUERY_MS", "0")
+
+import httpx  # noqa: E402
+
+from benchmarks.dataset import (  # noqa: E402
+    PASSWORD,
+    DatasetSize,
+    add_size_arguments,
+    devis_payload,
+    size_from_args,
+)
+
+
+@dataclass(frozen=True)
+class Slo:
+    p95_ms: float
+    p99_ms: float
+
+
+@dataclass(frozen=True)
+class Scenario:
+    name: str  # méthode et gabarit de route, clé du rapport
+    weight: int
+    expected: int
+    request: Callable  # (rng, size, vu) -> (méthode, url, kwargs)
+
+
+@dataclass
+class VirtualUser:
+    email: str
+    headers: dict
+
+
+def _login(rng, size, vu):
+    return "POST", "/auth/token", {"data": {"username": vu.email, "password": PASSWORD}}
+
+
+def _create_devis(rng, size, vu):
+    lots, lignes = rng.randint(1, 5), rng.randint(3, 15)
+    return "POST", "/devis/", {"json": devis_payload(rng, rng.randint(1, size.projets), lots, lignes)}
+
+
+def _list_devis(rng, size, vu):
+    params = {"limit": 50}
+    if rng.random() < 0.5:
+        params["statut"] = rng.choice(["Brouillon", "Envoyé", "Validé"])
+    return "GET", "/devis/", {"params": params}
+
+
+def _devis_detail(rng, size, vu):
+    return "GET", f"/devis/{rng.randint(1, size.devis)}", {}
+
+
+def _list_projets(rng, size, vu):
+    return "GET", "/crm/projets/", {"params": {"limit": 50}}
+
+
+def _create_pointage(rng, size, vu):
+    jour = date(2025, 1, 1) + timedelta(days=rng.randint(0, 364))
+    debut = datetime.combine(jour, datetime.min.time()) + timedelta(hours=rng.randint(6, 9))
+    return "POST", "/chantier/pointage/", {"json": {
+        "projet_id": rng.randint(1, size.projets),
+        "date_travail": jour.isoformat(),
+        "heures_debut": debut.isoformat(),
+        "heures_fin": (debut + timedelta(hours=rng.randint(4, 9))).isoformat(),
+    }}
+
+
+def _my_pointages(rng, size, vu):
+    mois = rng.randint(1, 12)
+    debut = date(2025, mois, 1)
+    return "GET", "/chantier/pointage/me", {
+        "params": {"start_date": debut.isoformat(), "end_date": (debut + timedelta(days=30)).isoformat()}
+    }
+
+
+def _journal(rng, size, vu):
+    return "GET", f"/chantier/journal/{rng.randint(1, size.projets)}", {}
+
+
+# Mélange observé en usage courant : beaucoup de lectures, des pointages, peu de connexions.
+SCENARIOS = (
+    Scenario("POST /auth/token", 2, 200, _login),
+    Scenario("POST /devis/", 5, 201, _create_devis),
+    Scenario("GET /devis/", 15, 200, _list_devis),
+    Scenario("GET /devis/{devis_id}", 25, 200, _devis_detail),
+    Scenario("GET /crm/projets/", 8, 200, _list_projets),
+    Scenario("POST /chantier/pointage/", 15, 201, _create_pointage),
+    Scenario("GET /chantier/pointage/me", 10, 200, _my_pointages),
+    Scenario("GET /chantier/journal/{projet_id}", 20, 200, _journal),
+)
+
+# SLO de latence par endpoint (bcrypt domine la connexion)
+SLOS = {
+    "POST /auth/token": Slo(p95_ms=1000, p99_ms=2000),
+    "POST /devis/": Slo(p95_ms=200, p99_ms=400),
+    "GET /devis/": Slo(p95_ms=150, p99_ms=300),
+    "GET /devis/{devis_id}": Slo(p95_ms=50, p99_ms=100),
+    "GET /crm/projets/": Slo(p95_ms=100, p99_ms=200),
+    "POST /chantier/pointage/": Slo(p95_ms=75, p99_ms=150),
+    "GET /chantier/pointage/me": Slo(p95_ms=75, p99_ms=150),
+    "GET /chantier/journal/{projet_id}": Slo(p95_ms=50, p99_ms=100),
+}
+
+
+class Recorder:
+    """Latences (ms) et erreurs par endpoint, pendant la fenêtre de mesure."""
+
+    def __init__(self):
+        self.latencies = {s.name: [] for s in SCENARIOS}
+        self.errors = {s.name: {} for s in SCENARIOS}
+
+    def record(self, name: str, duree_ms: float, erreur: Optional[str]) -> None:
+        if erreur is None:
+            self.latencies[name].append(duree_ms)
+        else:
+            self.errors[name][erreur] = self.errors[name].get(erreur, 0) + 1
+
+
+def percentile(ordonnees: list, p: float) -> float:
+    """Percentile au rang le plus proche (liste triée)."""
+    if not ordonnees:
+        return 0.0
+    rang = max(0, min(len(ordonnees) - 1, round(p / 100 * len(ordonnees) + 0.5) - 1))
+    return ordonnees[rang]
+
+
+async def login(client: httpx.AsyncClient, email: str) -> dict:
+    """Jeton d'un compte, en réessayant tant que le pool bcrypt est saturé (503)."""
+    for _ in range(50):
+        r = await client.post("/auth/token", data={"username": email, "password": PASSWORD})
+        if r.status_code == 200:
+            return {"Authorization": f"Bearer {r.json()['access_token']}"}
+        if r.status_code != 503:
+            raise RuntimeError(f"Connexion impossible pour {email} : {r.status_code} {r.text[:200]}")
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f"Connexion impossible pour {email} : pool de hachage saturé")
+
+
+async def virtual_user(
+    client, vu: VirtualUser, rng: random.Random, size: DatasetSize, recorder: Recorder,
+    debut_mesure: float, fin: float, think_ms: float,
+) -> None:
+    poids = [s.weight for s in SCENARIOS]
+    while time.perf_counter() < fin:
+        scenario = rng.choices(SCENARIOS, weights=poids)[0]
+        method, url, kwargs = scenario.request(rng, size, vu)
+        headers = {} if scenario.name == "POST /auth/token" else vu.headers
+        t0 = time.perf_counter()
+        try:
+            r = await client.request(method, url, headers=headers, **kwargs)
+            erreur = None if r.status_code == scenario.expected else str(r.status_code)
+        except httpx.HTTPError as exc:
+            erreur = type(exc).__name__
+        if t0 >= debut_mesure:
+            recorder.record(scenario.name, (time.perf_counter() - t0) * 1000, erreur)
+        if think_ms:
+            await asyncio.sleep(rng.expovariate(1 / think_ms) / 1000)
+
+
+async def run(args, size: DatasetSize) -> dict:
+    if args.url:
+        client = httpx.AsyncClient(
+            base_url=args.url, timeout=30,
+            limits=httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency),
+        )
+    else:
+        from app.main import app
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://load", timeout=30)
+
+    try:
+        # Un compte du jeu de données par utilisateur virtuel (réutilisé au-delà de size.users)
+        emails = [f"user{k % size.users + 1}@example.com" for k in range(args.concurrency)]
+        connexions = asyncio.Semaphore(2)
+
+        async def login_borne(email):
+            async with connexions:
+                return await login(client, email)
+
+        jetons = dict(zip(
+            sorted(set(emails)), await asyncio.gather(*(login_borne(e) for e in sorted(set(emails))))
+        ))
+        users = [VirtualUser(email=e, headers=jetons[e]) for e in emails]
+
+        recorder = Recorder()
+        debut = time.perf_counter()
+        debut_mesure = debut + args.warmup
+        fin = debut_mesure + args.duration
+        await asyncio.gather(*(
+            virtual_user(client, vu, random.Random(args.seed * 1000 + k), size, recorder,
+                         debut_mesure, fin, args.think_ms)
+            for k, vu in enumerate(users)
+        ))
+        duree = time.perf_counter() - debut_mesure
+    finally:
+        await client.aclose()
+        if not args.url:
+            from app.core import hashing
+            hashing.shutdown_pool()
+    return report(recorder, duree, args)
+
+
+def report(recorder: Recorder, duree: float, args) -> dict:
+    endpoints, total, total_erreurs = {}, 0, 0
+    for scenario in SCENARIOS:
+        latences = sorted(recorder.latencies[scenario.name])
+        erreurs = sum(recorder.errors[scenario.name].values())
+        n = len(latences) + erreurs
+        total += n
+        total_erreurs += erreurs
+        slo = SLOS[scenario.name]
+        p95, p99 = percentile(latences, 95), percentile(latences, 99)
+        endpoints[scenario.name] = {
+            "requests": n,
+            "errors": recorder.errors[scenario.name],
+            "rps": n / duree,
+            "p50_ms": percentile(latences, 50),
+            "p95_ms": p95,
+            "p99_ms": p99,
+            "slo": asdict(slo),
+            "slo_ok": bool(latences) and p95 <= slo.p95_ms and p99 <= slo.p99_ms,
+        }
+    taux_erreurs = total_erreurs / total if total else 1.0
+    return {
+        "target": args.url or "in-process",
+        "concurrency": args.concurrency,
+        "duration_s": duree,
+        "requests": total,
+        "throughput_rps": total / duree,
+        "error_rate": taux_erreurs,
+        "max_error_rate": args.max_error_rate,
+        "endpoints": endpoints,
+        "ok": taux_erreurs <= args.max_error_rate and all(e["slo_ok"] for e in endpoints.values()),
+    }
+
+
+def print_report(resultat: dict) -> None:
+    print(
+        f"\n{resultat['target']} | {resultat['concurrency']} utilisateurs virtuels | "
+        f"{resultat['requests']} requêtes en {resultat['duration_s']:.1f} s | "
+        f"{resultat['throughput_rps']:.1f} req/s | erreurs {resultat['error_rate']:.2%}\n"
+    )
+    print(f"{'endpoint':36s} {'req':>6s} {'req/s':>7s} {'err':>5s} {'p50':>8s} {'p95':>8s} "
+          f"{'p99':>8s}   SLO p95/p99 (ms)")
+    for nom, e in resultat["endpoints"].items():
+        erreurs = sum(e["errors"].values())
+        print(
+            f"{nom:36s} {e['requests']:6d} {e['rps']:7.1f} {erreurs:5d} {e['p50_ms']:8.1f} "
+            f"{e['p95_ms']:8.1f} {e['p99_ms']:8.1f}   {e['slo']['p95_ms']:.0f}/{e['slo']['p99_ms']:.0f} "
+            f"{'ok' if e['slo_ok'] else 'NON TENU'}"
+        )
+        if erreurs:
+            print(f"{'':36s} codes : {e['errors']}")
+    print("\nSLO tenus" if resultat["ok"] else "\nSLO NON TENUS")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    add_size_arguments(parser, default="small")
+    parser.add_argument("--url", help="serveur à tester (défaut : application en processus)")
+    parser.add_argument("--concurrency", type=int, default=20, help="utilisateurs virtuels simultanés")
+    parser.add_argument("--duration", type=float, default=30, help="durée mesurée (s)")
+    parser.add_argument("--warmup", type=float, default=5, help="préchauffage non mesuré (s)")
+    parser.add_argument("--think-ms", type=float, default=0, help="pause moyenne entre deux requêtes (ms)")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--json", help="écrit aussi le rapport dans ce fichier")
+    args = parser.parse_args()
+
+    size = size_from_args(args)
+    if not args.url:
+        from benchmarks.dataset import generate, reset_database
+        reset_database()
+        generate(size, seed_value=args.seed)
+
+    resultat = asyncio.run(run(args, size))
+    resultat["dataset"] = {"seed": args.seed, **asdict(size)}
+    print_report(resultat)
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resultat, f, indent=2, ensure_ascii=False)
+    return 0 if resultat["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())